@@ -0,0 +1,169 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .circuit import parse_circuit
+from .passes import simplify_gates
+
+# Mixed into every key. Bump whenever simulate()'s response format changes so
+# entries persisted by the shared on-disk store are never served stale.
+KEY_VERSION = 2
+
+
+def _theta(theta):
+    return theta.tolist() if isinstance(theta, np.ndarray) else theta
+
+
+def circuit_key(data, simplify=True, **options):
+    """
+    Canonical hash of a circuit request. The circuit is normalized through
+    parse_circuit and the peephole pass first, so editor-only fields (step,
+    incomplete gates, key order) and redundant gates never split the cache;
+    options such as shots/backend are mixed in. Pass simplify=False when the
+    response lists individual gates (gradients).
+    """
+    n, ops = parse_circuit(data, sweep=True)
+    if simplify:
+        ops = simplify_gates(ops)
+    canonical = json.dumps(
+        {"qubits": n, "ops": [[op.name, list(op.qubits), _theta(op.theta)] for op in ops],
+         "options": options, "v": KEY_VERSION},
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU of serialized responses, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._data.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        size = len(body)
+        # A single oversized result would just flush everything else out
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._data[key] = body
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class PrefixStateCache:
+    """
+    Checkpointed intermediate statevectors keyed by a hash of the gate prefix
+    that produced them; thread-safe LRU bounded by total bytes. A request that
+    extends or edits a recently simulated circuit resumes from the longest
+    cached prefix and only applies the remaining gates.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, interval=16):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.gates_skipped = 0
+
+    @staticmethod
+    def prefix_keys(n, ops, dtype=complex):
+        """Keys for every prefix of ops, keys[k] covering ops[:k], from one running hash."""
+        h = hashlib.blake2b(f"{KEY_VERSION}:{n}:{np.dtype(dtype).name}".encode("ascii"), digest_size=16)
+        keys = [h.digest()]
+        for op in ops:
+            h.update(f"|{op.name}:{op.qubits}:{op.theta!r}".encode("ascii"))
+            if op.matrix is not None:
+                h.update(np.ascontiguousarray(op.matrix).tobytes())
+            keys.append(h.digest())
+        return keys
+
+    def longest(self, keys):
+        """(k, state) for the longest cached prefix keys[k], or (0, None)."""
+        with self._lock:
+            for k in range(len(keys) - 1, -1, -1):
+                state = self._data.get(keys[k])
+                if state is not None:
+                    self._data.move_to_end(keys[k])
+                    self.hits += 1
+                    self.gates_skipped += k
+                    return k, state
+            self.misses += 1
+            return 0, None
+
+    def put(self, key, state):
+        # A single state taking over a quarter of the budget would thrash the rest
+        size = state.nbytes
+        if size * 4 > self.max_bytes:
+            return
+        state.flags.writeable = False
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._data[key] = state
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "gates_skipped": self.gates_skipped,
+            }
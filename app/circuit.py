@@ -0,0 +1,151 @@
+from collections import namedtuple
+
+import numpy as np
+
+SINGLE_QUBIT_GATES = ("X", "Y", "Z", "H", "S", "T", "RX", "RY", "RZ")
+TWO_QUBIT_GATES = ("CNOT", "CZ", "SWAP")
+ROTATION_GATES = ("RX", "RY", "RZ")
+
+# Upper bound on the number of angles a swept theta may expand to
+MAX_SWEEP_POINTS = 1024
+
+# A normalized gate: name is the editor's type string, qubits is a tuple of
+# wire indices (control first for CNOT/CZ) and theta is only set for rotations.
+# In sweep mode theta may be a 1-D array with one angle per sweep point.
+# matrix is only set on "FUSED" ops built by compiler passes (see app.passes).
+Op = namedtuple("Op", ["name", "qubits", "theta", "matrix"], defaults=(None,))
+
+
+def _check_qubit(q, n):
+    if not isinstance(q, int) or isinstance(q, bool) or not 0 <= q < n:
+        raise ValueError(f"Qubit index {q!r} out of range for {n} qubits")
+    return q
+
+
+def _sweep_values(spec):
+    # A list of angles, or {"start", "stop", "num"} expanded like np.linspace
+    if isinstance(spec, dict):
+        values = np.linspace(float(spec.get("start", 0)), float(spec.get("stop", 0)), int(spec.get("num", 50)))
+    elif isinstance(spec, (list, tuple)):
+        values = np.array([float(v) for v in spec])
+    else:
+        return float(spec)
+    if not 1 <= values.size <= MAX_SWEEP_POINTS:
+        raise ValueError(f"A sweep needs between 1 and {MAX_SWEEP_POINTS} points")
+    return values
+
+
+def _parse_gate(g, n, sweep=False):
+    # One editor gate as an Op, or None for gates the simulator skips
+    t = g.get("type")
+    q = g.get("target", 0)
+    ctr = g.get("control")
+    p = g.get("params") or {}
+    if t in SINGLE_QUBIT_GATES:
+        theta = None
+        if t in ROTATION_GATES:
+            theta = _sweep_values(p.get("theta", 0)) if sweep else float(p.get("theta", 0))
+        return Op(t, (_check_qubit(q, n),), theta)
+    if t in ("CNOT", "CZ") and ctr is not None:
+        if ctr == q:
+            raise ValueError(f"{t} control and target must differ")
+        return Op(t, (_check_qubit(ctr, n), _check_qubit(q, n)), None)
+    if t == "SWAP":
+        other = p.get("other", q)
+        if other == q:
+            raise ValueError("SWAP needs two different qubits")
+        return Op(t, (_check_qubit(q, n), _check_qubit(other, n)), None)
+    if t == "MEASURE":
+        return Op(t, (_check_qubit(q, n),), None)
+    return None
+
+
+def _circuit_width(data):
+    n = int(data.get("qubits", 1))
+    if n < 1:
+        raise ValueError("Circuit needs at least one qubit")
+    return n
+
+
+def parse_moments(data, sweep=False):
+    """
+    Turns the editor's circuit JSON into (n_qubits, [(step, ops)]), one entry
+    per moment, built in a single pass from the editor's "step" columns and
+    ordered by step. Gates in one step must act on disjoint qubits. If any
+    gate has no step, every gate becomes its own moment in list order.
+    """
+    n = _circuit_width(data)
+    parsed = []
+    for g in data.get("gates", []):
+        op = _parse_gate(g, n, sweep)
+        if op is not None:
+            parsed.append((g.get("step"), op))
+    if any(step is None for step, _ in parsed):
+        return n, [(None, [op]) for _, op in parsed]
+
+    moments = {}
+    used = {}
+    for step, op in parsed:
+        if isinstance(step, bool) or not isinstance(step, (int, float)):
+            raise ValueError(f"Invalid step {step!r}")
+        busy = used.setdefault(step, set())
+        clash = busy.intersection(op.qubits)
+        if clash:
+            raise ValueError(f"Step {step} uses qubit {min(clash)} more than once")
+        busy.update(op.qubits)
+        moments.setdefault(step, []).append(op)
+    return n, sorted(moments.items(), key=lambda item: item[0])
+
+
+def parse_circuit(data, sweep=False):
+    """
+    Turns the editor's circuit JSON into (n_qubits, ops), in moment order.
+    Mirrors what circuit_from_json has always accepted: unknown gate types and
+    CNOT/CZ without a control are skipped, everything else is validated.
+    With sweep=True a rotation's theta may also be a list or linspace spec.
+    """
+    n, moments = parse_moments(data, sweep)
+    return n, [op for _, ops in moments for op in ops]
+
+
+def measured_qubits(ops):
+    return sorted({op.qubits[0] for op in ops if op.name == "MEASURE"})
+
+
+def defer_measurements(n, ops):
+    """
+    Defers mid-circuit measurements: each one becomes a CNOT onto a fresh
+    ancilla that is read at the end, which leaves the joint distribution of the
+    records unchanged. Returns (n_total, unitary ops, {qubit: wire read}); when
+    every measurement is already terminal n_total == n and no gate is added.
+    """
+    later = set()
+    terminal = [False] * len(ops)
+    for i in range(len(ops) - 1, -1, -1):
+        op = ops[i]
+        if op.name == "MEASURE":
+            terminal[i] = op.qubits[0] not in later
+        else:
+            later.update(op.qubits)
+
+    unitary = []
+    readout = {}
+    total = n
+    for op, is_terminal in zip(ops, terminal):
+        if op.name != "MEASURE":
+            unitary.append(op)
+        elif is_terminal:
+            readout[op.qubits[0]] = op.qubits[0]
+        else:
+            unitary.append(Op("CNOT", (op.qubits[0], total), None))
+            readout[op.qubits[0]] = total
+            total += 1
+    return total, unitary, readout
+
+
+def sweep_points(ops):
+    """Number of points shared by every swept theta (1 when nothing is swept)."""
+    sizes = {op.theta.size for op in ops if isinstance(op.theta, np.ndarray)}
+    if len(sizes) > 1:
+        raise ValueError("All swept angles must have the same number of points")
+    return sizes.pop() if sizes else 1
@@ -7,3 +7,21 @@ class Config:
     DB_PASS = os.getenv("DB_PASS", "")
     DB_NAME = os.getenv("DB_NAME", "qircuitlearn")
     JSONIFY_PRETTYPRINT_REGULAR = False
+    # Simulation engine for /api/simulate: "numpy" (built-in) or "cirq" (reference)
+    SIM_BACKEND = os.getenv("SIM_BACKEND", "numpy")
+    # In-process LRU of deterministic /api/simulate responses
+    SIM_CACHE_ENTRIES = int(os.getenv("SIM_CACHE_ENTRIES", "512"))
+    SIM_CACHE_BYTES = int(os.getenv("SIM_CACHE_BYTES", str(32 * 1024 * 1024)))
+    # SQLite store shared by all Passenger workers; set SIM_STORE_PATH="" to disable
+    SIM_STORE_PATH = os.getenv("SIM_STORE_PATH", os.path.join(os.path.dirname(__file__), "../sim_cache.db"))
+    SIM_STORE_TTL = int(os.getenv("SIM_STORE_TTL", str(24 * 3600)))
+    SIM_STORE_BYTES = int(os.getenv("SIM_STORE_BYTES", str(256 * 1024 * 1024)))
+    # Checkpointed prefix states the editor's edit-and-rerun loop resumes from
+    SIM_PREFIX_BYTES = int(os.getenv("SIM_PREFIX_BYTES", str(64 * 1024 * 1024)))
+    # Kernel threads per worker (0 = every core) and the state width where they kick in
+    SIM_THREADS = int(os.getenv("SIM_THREADS", "0"))
+    SIM_THREAD_MIN_QUBITS = int(os.getenv("SIM_THREAD_MIN_QUBITS", "18"))
+    # Scratch files of the "memmap" backend (empty: the system temp dir) and the
+    # bytes one worker's live out-of-core states may take there
+    SIM_SCRATCH_DIR = os.getenv("SIM_SCRATCH_DIR", "")
+    SIM_SCRATCH_QUOTA = int(os.getenv("SIM_SCRATCH_QUOTA", str(16 * 1024 ** 3)))
@@ -0,0 +1,62 @@
+import base64
+
+import numpy as np
+
+# Response encodings for dense arrays. "json" keeps the historical layout
+# (statevector as str(complex) values, probabilities as a list of floats);
+# "base64" packs little-endian floats, with complex amplitudes interleaved
+# as real/imag pairs, so the browser can decode them straight into typed arrays.
+ENCODINGS = ("json", "base64")
+DTYPES = {"float32": "<f4", "float64": "<f8"}
+
+# Accept-header form of the base64 encoding, e.g.
+#   Accept: application/vnd.qircuit.base64+json; dtype=float32
+BASE64_MIMETYPE = "application/vnd.qircuit.base64+json"
+
+
+def negotiate(encoding=None, dtype=None, accept=None):
+    """
+    Picks (encoding, dtype) from explicit request fields, falling back to the
+    Accept header (a werkzeug MIMEAccept) and then to plain JSON. From the
+    header, base64 is only chosen when its quality is at least that of
+    application/json.
+    """
+    if not encoding and accept is not None:
+        best, best_params = 0, ""
+        for value, quality in accept:
+            mimetype, _, params = value.partition(";")
+            if mimetype.strip() == BASE64_MIMETYPE and quality > best:
+                best, best_params = quality, params
+        if best and best >= accept.quality("application/json"):
+            encoding = "base64"
+            for param in best_params.split(";"):
+                name, _, val = param.partition("=")
+                if name.strip() == "dtype" and not dtype:
+                    dtype = val.strip()
+    encoding = encoding or "json"
+    dtype = dtype or "float64"
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown format: {encoding}")
+    if dtype not in DTYPES:
+        raise ValueError(f"Unknown dtype: {dtype}")
+    return encoding, dtype
+
+
+def encode_array(values, dtype="float64"):
+    data = np.ascontiguousarray(values, dtype=DTYPES[dtype])
+    return {
+        "encoding": "base64",
+        "dtype": dtype,
+        "shape": list(data.shape),
+        "data": base64.b64encode(data.tobytes()).decode("ascii"),
+    }
+
+
+def encode_statevector(sv, dtype="float64"):
+    # (2^n, 2) array of interleaved real/imag parts
+    return encode_array(np.stack([sv.real, sv.imag], axis=-1), dtype)
+
+
+def decode_array(field):
+    raw = base64.b64decode(field["data"])
+    return np.frombuffer(raw, dtype=DTYPES[field["dtype"]]).reshape(field["shape"])
@@ -0,0 +1,55 @@
+import numpy as np
+
+from . import observables, statevector
+from .circuit import ROTATION_GATES
+
+# Gradients of an observable's expectation with respect to every RX/RY/RZ
+# angle. Each rotation is exp(-i theta P / 2), so dR/dtheta = -i/2 P R.
+GRADIENT_METHODS = ("adjoint", "parameter_shift")
+
+
+def parameter_ops(ops):
+    """Positions in ops of the rotations that carry a parameter."""
+    return [i for i, op in enumerate(ops) if op.name in ROTATION_GATES]
+
+
+def adjoint_gradient(n, ops, terms):
+    """
+    Adjoint differentiation: one forward pass, then a single backward sweep
+    that un-applies each gate to both |psi> and |lambda> = H|psi>. Every
+    parameter's gradient is 2 Re <lambda| -i/2 P |psi> at its gate, so all of
+    them cost about two simulations in total. Returns (expectation, grads).
+    """
+    psi = statevector.zero_state(n)
+    for op in ops:
+        psi = statevector.apply_op(psi, op)
+    lam = observables.apply_observable(psi, terms)
+    value = float(np.vdot(psi, lam).real)
+
+    grads = {}
+    for i in range(len(ops) - 1, -1, -1):
+        op = ops[i]
+        if op.name in ROTATION_GATES:
+            generator = statevector.apply_matrix(psi, statevector.FIXED_GATES[op.name[1]], op.qubits)
+            grads[i] = float(np.vdot(lam, -0.5j * generator).real * 2)
+        inverse = statevector.gate_matrix(op).conj().T
+        psi = statevector.apply_matrix(psi, inverse, op.qubits)
+        lam = statevector.apply_matrix(lam, inverse, op.qubits)
+    return value, [grads[i] for i in parameter_ops(ops)]
+
+
+def shifted_circuits(ops):
+    """The 2P circuits of the parameter-shift rule, theta +/- pi/2 per parameter."""
+    circuits = []
+    for i in parameter_ops(ops):
+        for shift in (np.pi / 2, -np.pi / 2):
+            shifted = list(ops)
+            shifted[i] = ops[i]._replace(theta=ops[i].theta + shift)
+            circuits.append(shifted)
+    return circuits
+
+
+def parameter_shift_gradient(expectations):
+    """Gradients from the expectations of shifted_circuits, in the same order."""
+    values = np.asarray(expectations, dtype=float).reshape(-1, 2)
+    return ((values[:, 0] - values[:, 1]) / 2).tolist()
@@ -0,0 +1,157 @@
+import numpy as np
+
+from .statevector import FIXED_GATES, gate_matrix
+
+# Matrix-product-state engine for wide, weakly entangled circuits. Site q holds
+# a (left bond, 2, right bond) tensor; the chain keeps one orthogonality
+# center, so every two-site SVD truncation is the optimal one for that bond.
+# Bitstrings read q0 first, like the dense engine's outcome strings.
+
+MAX_MPS_QUBITS = 128
+DEFAULT_BOND = 64
+MAX_BOND = 1024
+
+# Singular values below this fraction of the largest are always dropped
+SVD_CUTOFF = 1e-12
+
+_SWAP = FIXED_GATES["SWAP"]
+
+
+class MPS:
+    """
+    |0...0> on n qubits as an MPS whose bonds are capped at max_bond.
+    truncation_error accumulates the discarded weight of every SVD, and
+    fidelity is the product of the kept weights, the usual estimate of the
+    overlap with the exact state.
+    """
+
+    def __init__(self, n, max_bond=DEFAULT_BOND, dtype=complex):
+        if not 1 <= n <= MAX_MPS_QUBITS:
+            raise ValueError(f"The MPS backend supports 1 to {MAX_MPS_QUBITS} qubits")
+        if not 1 <= max_bond <= MAX_BOND:
+            raise ValueError(f"max_bond must be between 1 and {MAX_BOND}")
+        self.n = n
+        self.max_bond = max_bond
+        self.tensors = []
+        for _ in range(n):
+            site = np.zeros((1, 2, 1), dtype=dtype)
+            site[0, 0, 0] = 1
+            self.tensors.append(site)
+        self.center = 0
+        self.truncation_error = 0.0
+        self.fidelity = 1.0
+        self.swaps = 0
+
+    def bond_dims(self):
+        return [t.shape[2] for t in self.tensors[:-1]]
+
+    def info(self):
+        return {
+            "max_bond": self.max_bond,
+            "bond_dims": self.bond_dims(),
+            "truncation_error": self.truncation_error,
+            "fidelity": self.fidelity,
+            "swaps": self.swaps,
+        }
+
+    def _move_center(self, q):
+        # QR sweeps; the tensors passed over become left or right isometries
+        t = self.tensors
+        while self.center < q:
+            c = self.center
+            left, _, right = t[c].shape
+            Q, R = np.linalg.qr(t[c].reshape(left * 2, right))
+            t[c] = Q.reshape(left, 2, -1)
+            t[c + 1] = np.tensordot(R, t[c + 1], axes=(1, 0))
+            self.center += 1
+        while self.center > q:
+            c = self.center
+            left, _, right = t[c].shape
+            Q, R = np.linalg.qr(t[c].reshape(left, 2 * right).T)
+            t[c] = Q.T.reshape(-1, 2, right)
+            t[c - 1] = np.tensordot(t[c - 1], R.T, axes=(2, 0))
+            self.center -= 1
+
+    def apply_1q(self, m, q):
+        self.tensors[q] = np.einsum("ij,ajb->aib", m.astype(self.tensors[q].dtype), self.tensors[q])
+
+    def _apply_adjacent(self, m, q):
+        # A 4x4 gate on sites (q, q+1), site q as the high bit, then a truncated split
+        self._move_center(q)
+        a, b = self.tensors[q], self.tensors[q + 1]
+        theta = np.tensordot(a, b, axes=(2, 0))
+        theta = np.einsum("ijkl,aklb->aijb", m.reshape(2, 2, 2, 2).astype(a.dtype), theta)
+        left, right = a.shape[0], b.shape[2]
+        u, s, vh = np.linalg.svd(theta.reshape(left * 2, 2 * right), full_matrices=False)
+        weights = s ** 2
+        total = weights.sum()
+        keep = min(self.max_bond, max(1, int(np.count_nonzero(s > SVD_CUTOFF * s[0]))))
+        kept = weights[:keep].sum()
+        if keep < s.size:
+            discarded = float((total - kept) / total)
+            self.truncation_error += discarded
+            self.fidelity *= 1 - discarded
+        s = s[:keep] / np.sqrt(kept)
+        self.tensors[q] = u[:, :keep].reshape(left, 2, keep)
+        self.tensors[q + 1] = (s[:, None] * vh[:keep]).reshape(keep, 2, right)
+        self.center = q + 1
+
+    def apply_2q(self, m, qubits):
+        """
+        A 4x4 gate on any two qubits, qubits[0] as the high bit. Distant
+        qubits are first brought next to each other with nearest-neighbour
+        SWAPs and moved back afterwards.
+        """
+        a, b = qubits
+        if a > b:
+            m = _SWAP @ m @ _SWAP
+            a, b = b, a
+        route = range(a, b - 1)
+        for q in route:
+            self._apply_adjacent(_SWAP, q)
+        self._apply_adjacent(m, b - 1)
+        for q in reversed(route):
+            self._apply_adjacent(_SWAP, q)
+        self.swaps += 2 * len(route)
+
+    def apply_ops(self, ops):
+        for op in ops:
+            if op.name == "MEASURE":
+                raise ValueError("MPS circuits need measurements deferred first")
+            if len(op.qubits) == 1:
+                self.apply_1q(gate_matrix(op), op.qubits[0])
+            else:
+                self.apply_2q(gate_matrix(op), op.qubits)
+
+    def amplitude(self, bits):
+        """<bits|psi> for a sequence of n 0/1 values, by one pass of matrix-vector products."""
+        v = np.ones(1, dtype=self.tensors[0].dtype)
+        for site, bit in zip(self.tensors, bits):
+            v = v @ site[:, bit, :]
+        return complex(v[0])
+
+    def statevector(self):
+        """The dense 2^n vector, only sensible for small n."""
+        psi = self.tensors[0]
+        for site in self.tensors[1:]:
+            psi = np.tensordot(psi, site, axes=(psi.ndim - 1, 0))
+        return psi.reshape(-1)
+
+    def sample(self, shots, rng):
+        """
+        (shots, n) bit matrix drawn qubit by qubit: with the center at site 0
+        everything to the right is an isometry, so the conditional probability
+        of each bit is the norm of the left environment after fixing it.
+        """
+        self._move_center(0)
+        env = np.ones((shots, 1), dtype=self.tensors[0].dtype)
+        bits = np.zeros((shots, self.n), dtype=int)
+        rows = np.arange(shots)
+        for q, site in enumerate(self.tensors):
+            w = np.einsum("sa,abr->sbr", env, site)
+            p = np.sum(np.abs(w) ** 2, axis=2)
+            p1 = p[:, 1] / p.sum(axis=1)
+            b = (rng.random(shots) < p1).astype(int)
+            bits[:, q] = b
+            env = w[rows, b] / np.sqrt(p[rows, b])[:, None]
+        return bits
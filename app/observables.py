@@ -0,0 +1,124 @@
+import numpy as np
+
+from .statevector import FIXED_GATES, apply_matrix
+
+# Observables are weighted sums of Pauli strings, e.g. {"ZZI": 0.5, "XIX": -1}.
+# Character k of a string acts on qubit k, the same order as bitstring outcomes.
+PAULI_CHARS = "IXYZ"
+
+# Upper bound on the number of terms in one observable
+MAX_TERMS = 4096
+
+# Single-qubit rotations that take each Pauli's eigenbasis to the Z basis
+_TO_Z_BASIS = {
+    "X": FIXED_GATES["H"],
+    "Y": FIXED_GATES["H"] @ np.diag([1, -1j]),
+}
+
+
+def parse_observable(spec, n):
+    """
+    Normalizes an observable into a list of (pauli, coeff) terms. Accepts a
+    {"ZZI": 0.5} mapping or a list of [pauli, coeff] pairs / {"pauli", "coeff"}
+    objects; strings may be shorter than n and are padded with identities.
+    """
+    if isinstance(spec, dict):
+        items = list(spec.items())
+    elif isinstance(spec, (list, tuple)):
+        items = [(t.get("pauli"), t.get("coeff", 1)) if isinstance(t, dict) else tuple(t) for t in spec]
+    else:
+        raise ValueError("Observable must be a mapping or a list of Pauli terms")
+    if not 1 <= len(items) <= MAX_TERMS:
+        raise ValueError(f"An observable needs between 1 and {MAX_TERMS} terms")
+
+    terms = []
+    for pauli, coeff in items:
+        if not isinstance(pauli, str):
+            raise ValueError(f"Pauli string expected, got {pauli!r}")
+        pauli = pauli.upper()
+        if len(pauli) > n or any(c not in PAULI_CHARS for c in pauli):
+            raise ValueError(f"Invalid Pauli string {pauli!r} for {n} qubits")
+        terms.append((pauli.ljust(n, "I"), float(coeff)))
+    return terms
+
+
+def commuting_groups(terms):
+    """
+    Greedily splits term indices into qubit-wise commuting groups: within a
+    group every qubit is acted on by at most one non-identity Pauli, so one
+    basis rotation diagonalizes the whole group. Returns [(basis, [indices])].
+    """
+    groups = []
+    for i, (pauli, _) in enumerate(terms):
+        for basis, members in groups:
+            if all(a == "I" or b == "I" or a == b for a, b in zip(pauli, basis)):
+                basis[:] = [b if a == "I" else a for a, b in zip(pauli, basis)]
+                members.append(i)
+                break
+        else:
+            groups.append((list(pauli), [i]))
+    return [("".join(basis), members) for basis, members in groups]
+
+
+def _diagonal_expectation(probs, support):
+    # <Z_S> from a (2,)*n probability tensor: marginalize onto S, then fold
+    # each remaining axis with its +1/-1 eigenvalues
+    n = probs.ndim
+    m = probs.sum(axis=tuple(q for q in range(n) if q not in support))
+    for _ in support:
+        m = m[0] - m[1]
+    return float(m)
+
+
+def term_expectations(psi, terms):
+    """
+    Exact <psi|P|psi> for every Pauli term of a (2,)*n state tensor. Each
+    qubit-wise commuting group costs one rotation pass into the Z basis (none
+    for purely diagonal groups) and then a vectorized diagonal evaluation.
+    """
+    values = np.empty(len(terms))
+    for basis, members in commuting_groups(terms):
+        rotated = psi
+        for q, c in enumerate(basis):
+            if c in _TO_Z_BASIS:
+                rotated = apply_matrix(rotated, _TO_Z_BASIS[c], (q,))
+        probs = np.abs(rotated) ** 2
+        for i in members:
+            support = tuple(q for q, c in enumerate(terms[i][0]) if c != "I")
+            values[i] = _diagonal_expectation(probs, support)
+    return values
+
+
+def is_diagonal(terms):
+    return all(c in "IZ" for pauli, _ in terms for c in pauli)
+
+
+def diagonal(terms, n):
+    """Eigenvalues of a Z-type observable as a (2,)*n tensor over basis states."""
+    diag = np.zeros((2,) * n)
+    for pauli, coeff in terms:
+        signs = np.ones((1,) * n)
+        for q, c in enumerate(pauli):
+            if c == "Z":
+                signs = signs * np.array([1.0, -1.0]).reshape((1,) * q + (2,) + (1,) * (n - q - 1))
+        diag += coeff * signs
+    return diag
+
+
+def expectation(psi, terms):
+    """<psi|H|psi> together with the per-term expectations it was summed from."""
+    values = term_expectations(psi, terms)
+    coeffs = np.array([c for _, c in terms])
+    return float(coeffs @ values), values
+
+
+def apply_observable(psi, terms):
+    """H|psi> for a (2,)*n state tensor, as a sum of Pauli-string applications."""
+    out = np.zeros_like(psi)
+    for pauli, coeff in terms:
+        term = psi
+        for q, c in enumerate(pauli):
+            if c != "I":
+                term = apply_matrix(term, FIXED_GATES[c], (q,))
+        out += coeff * term
+    return out
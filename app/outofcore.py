@@ -0,0 +1,192 @@
+import itertools
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from . import statevector
+
+# Out-of-core statevector engine: the amplitudes live in an np.memmap on local
+# disk and gates are applied by streaming the file through RAM. The leading
+# axes of the (2,)*n tensor index contiguous chunks of the last CHUNK_QUBITS
+# axes, so every pass reads and writes the file sequentially.
+
+MAX_OOC_QUBITS = 32
+
+# 2^20 amplitudes (16 MB at complex128) per chunk
+CHUNK_QUBITS = 20
+
+# Chunk-index axes a single pass may touch; its working set is 2^3 chunks
+MAX_HIGH_QUBITS = 3
+
+DEFAULT_QUOTA = 16 * 1024 ** 3
+
+# Upper bound on the outcomes one sparse readout may return
+MAX_SIGNIFICANT = 2 ** 20
+
+_scratch_dir = None
+_quota = DEFAULT_QUOTA
+_in_use = 0
+_lock = threading.Lock()
+
+
+def configure(scratch_dir=None, quota=DEFAULT_QUOTA):
+    """
+    Sets where scratch statevectors are written (None: the system temp
+    directory) and how many bytes all of this process's live ones may take.
+    """
+    global _scratch_dir, _quota
+    _scratch_dir = scratch_dir or None
+    _quota = int(quota)
+
+
+def usage():
+    return {"scratch_dir": _scratch_dir or tempfile.gettempdir(), "quota": _quota, "in_use": _in_use}
+
+
+class ScratchState:
+    """
+    |0...0> on n qubits in an anonymous scratch file, counted against the
+    quota until close(). array is the (2,)*n memmap.
+    """
+
+    def __init__(self, n, dtype=complex):
+        global _in_use
+        if not 1 <= n <= MAX_OOC_QUBITS:
+            raise ValueError(f"The memmap backend supports 1 to {MAX_OOC_QUBITS} qubits")
+        self.nbytes = (1 << n) * np.dtype(dtype).itemsize
+        directory = _scratch_dir or tempfile.gettempdir()
+        with _lock:
+            if _in_use + self.nbytes > _quota:
+                raise ValueError(
+                    f"A {n}-qubit state needs {self.nbytes} bytes of scratch space; "
+                    f"{_quota - _in_use} of the {_quota} byte quota are free"
+                )
+            if self.nbytes > shutil.disk_usage(directory).free:
+                raise ValueError(f"Not enough free disk space in {directory} for a {n}-qubit state")
+            _in_use += self.nbytes
+        try:
+            # Unlinked on creation: the space is reclaimed even if the worker dies
+            self._file = tempfile.TemporaryFile(dir=directory, prefix="qircuit-state-")
+            self._file.truncate(self.nbytes)
+            self.array = np.memmap(self._file, dtype=dtype, mode="r+", shape=(2,) * n)
+            self.array[(0,) * n] = 1
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        global _in_use
+        if self.nbytes:
+            self.array = None
+            if hasattr(self, "_file"):
+                self._file.close()
+            with _lock:
+                _in_use -= self.nbytes
+            self.nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def segments(ops, n, chunk_qubits=CHUNK_QUBITS):
+    """
+    Splits ops into streaming passes: [(high, ops)] where high is the sorted
+    tuple of chunk-index axes (those before the last chunk_qubits) the pass
+    touches, at most MAX_HIGH_QUBITS of them.
+    """
+    low = n - chunk_qubits
+    passes = []
+    current, high = [], set()
+    for op in ops:
+        touched = {q for q in op.qubits if q < low}
+        if current and len(high | touched) > MAX_HIGH_QUBITS:
+            passes.append((tuple(sorted(high)), current))
+            current, high = [], set()
+        current.append(op)
+        high |= touched
+    if current:
+        passes.append((tuple(sorted(high)), current))
+    return passes
+
+
+def apply_ops(psi, ops, chunk_qubits=CHUNK_QUBITS):
+    """
+    Applies unitary ops to a (2,)*n memmap in place. Each pass walks the
+    chunk-index axes it does not touch in order, reads the 2^len(high)
+    chunks of that slice into RAM, runs the ops there with the in-memory
+    kernels (cache blocking and threads included) and writes them back.
+    """
+    n = psi.ndim
+    if n <= chunk_qubits:
+        psi[...] = statevector.apply_ops(np.array(psi), ops)
+        return
+    low = n - chunk_qubits
+    for high, segment in segments(ops, n, chunk_qubits):
+        outer = [q for q in range(low) if q not in high]
+        # Integer indices drop the outer axes; the rest keep their order
+        local = {q: i for i, q in enumerate(list(high) + list(range(low, n)))}
+        segment = [op._replace(qubits=tuple(local[q] for q in op.qubits)) for op in segment]
+        for bits in itertools.product((0, 1), repeat=len(outer)):
+            fixed = dict(zip(outer, bits))
+            view = psi[tuple(fixed.get(q, slice(None)) for q in range(n))]
+            view[...] = statevector.apply_ops(np.array(view), segment)
+    psi.flush()
+
+
+def chunks(psi, chunk_qubits=CHUNK_QUBITS):
+    """(offset, amplitudes) over the flattened state, one in-RAM chunk at a time."""
+    flat = psi.reshape(-1)
+    size = 1 << min(chunk_qubits, psi.ndim)
+    for start in range(0, flat.size, size):
+        yield start, np.array(flat[start:start + size])
+
+
+def significant(psi, threshold=None, top_k=None, chunk_qubits=CHUNK_QUBITS, max_entries=MAX_SIGNIFICANT):
+    """
+    Streaming version of the sparse selection in simulate(): (indices,
+    amplitudes, total probability) of the outcomes above threshold, capped
+    at the top_k most likely, without holding all 2^n probabilities. Raises
+    ValueError as soon as more than max_entries outcomes would be kept.
+    """
+    if top_k and top_k > max_entries:
+        raise ValueError(f"top_k is limited to {max_entries}")
+    idx = np.empty(0, dtype=np.int64)
+    amps = np.empty(0, dtype=psi.dtype)
+    total = 0.0
+    for start, chunk in chunks(psi, chunk_qubits):
+        probs = chunk.real ** 2 + chunk.imag ** 2
+        total += float(probs.sum(dtype=float))
+        keep = np.arange(probs.size) if threshold is None else np.flatnonzero(probs > threshold)
+        if top_k and top_k < keep.size:
+            keep = keep[np.argpartition(probs[keep], -top_k)[-top_k:]]
+        idx = np.concatenate([idx, keep + start])
+        amps = np.concatenate([amps, chunk[keep]])
+        if top_k and top_k < idx.size:
+            best = np.argpartition(np.abs(amps) ** 2, -top_k)[-top_k:]
+            idx, amps = idx[best], amps[best]
+        if idx.size > max_entries:
+            raise ValueError(f"More than {max_entries} outcomes are above the threshold; raise it or set top_k")
+    order = np.argsort(idx)
+    return idx[order], amps[order], total
+
+
+def sample_indices(psi, shots, rng, chunk_qubits=CHUNK_QUBITS):
+    """
+    Draws shots basis-state indices in two sequential passes: the first sums
+    each chunk's probability and splits the shots between chunks with one
+    multinomial, the second samples inside every chunk that drew any.
+    """
+    weights = np.array([float((np.abs(chunk) ** 2).sum(dtype=float)) for _, chunk in chunks(psi, chunk_qubits)])
+    per_chunk = rng.multinomial(shots, weights / weights.sum())
+    out = []
+    for (start, chunk), count in zip(chunks(psi, chunk_qubits), per_chunk):
+        if count:
+            out.append(start + statevector.sample_indices(np.abs(chunk) ** 2, count, rng))
+    idx = np.concatenate(out) if out else np.empty(0, dtype=np.int64)
+    rng.shuffle(idx)
+    return idx
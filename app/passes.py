@@ -0,0 +1,196 @@
+import numpy as np
+
+from .circuit import Op, ROTATION_GATES, SINGLE_QUBIT_GATES, TWO_QUBIT_GATES
+from .statevector import FIXED_GATES, gate_kind, gate_matrix, matrix_kind
+
+# Compiler passes over parsed op lists, run before the dense NumPy engine.
+
+_SWAP = FIXED_GATES["SWAP"]
+
+# Below this width a statevector sweep costs less than fusing gates saves
+FUSION_MIN_QUBITS = 12
+
+# Gates that are their own inverse; CZ and SWAP are also symmetric in their qubits
+SELF_INVERSE = ("H", "X", "Y", "Z", "CNOT", "CZ", "SWAP")
+_SYMMETRIC = ("CZ", "SWAP")
+
+# Z-axis phase gates diag(1, e^(i k pi/4)) by k; products stay exact (no global phase)
+_PHASE_STEPS = {"T": 1, "S": 2, "Z": 4}
+_PHASE_GATES = {1: "T", 2: "S", 4: "Z"}
+
+# Rotation angles are reduced mod 4 pi, the period of RX/RY/RZ themselves
+_ROTATION_PERIOD = 4 * np.pi
+_ANGLE_EPS = 1e-12
+
+
+def _fused(qubits, matrix):
+    return Op("FUSED", tuple(qubits), None, matrix)
+
+
+def _is_identity_rotation(op):
+    r = op.theta % _ROTATION_PERIOD
+    return min(r, _ROTATION_PERIOD - r) < _ANGLE_EPS
+
+
+def _combine(prev, op):
+    """
+    The result of prev followed by op on the same qubits: [] when they
+    cancel, [merged op] when they combine, None when nothing applies.
+    """
+    if isinstance(prev.theta, np.ndarray) or isinstance(op.theta, np.ndarray):
+        return None
+    if prev.name in _PHASE_STEPS and op.name in _PHASE_STEPS:
+        k = (_PHASE_STEPS[prev.name] + _PHASE_STEPS[op.name]) % 8
+        if k == 0:
+            return []
+        return [Op(_PHASE_GATES[k], op.qubits, None)] if k in _PHASE_GATES else None
+    if prev.name == op.name and op.name in ROTATION_GATES:
+        merged = op._replace(theta=prev.theta + op.theta)
+        return [] if _is_identity_rotation(merged) else [merged]
+    if prev.name == op.name and op.name in SELF_INVERSE:
+        if prev.qubits == op.qubits or op.name in _SYMMETRIC:
+            return []
+    return None
+
+
+def simplify_gates(ops):
+    """
+    Peephole pass: cancels self-inverse pairs (H.H, CNOT.CNOT, ...), merges
+    S/T/Z phases and same-axis rotation angles, and drops identity rotations.
+    Two gates only meet when nothing in between touches their qubits, so
+    gates on other wires are commuted through and never block a rewrite.
+    Rewrites cascade (H.X.X.H vanishes) and never change the global phase,
+    so the simplified circuit has exactly the same statevector.
+    """
+    out = []
+    stacks = {}  # qubit -> indices into out of the live ops on that wire
+
+    def push(op):
+        if op.theta is not None and not isinstance(op.theta, np.ndarray) and _is_identity_rotation(op):
+            return
+        tops = {stacks[q][-1] if stacks.get(q) else None for q in op.qubits}
+        if len(tops) == 1 and None not in tops:
+            j = tops.pop()
+            prev = out[j]
+            if set(prev.qubits) == set(op.qubits):
+                combined = _combine(prev, op)
+                if combined is not None:
+                    out[j] = None
+                    for q in prev.qubits:
+                        stacks[q].pop()
+                    for new in combined:
+                        push(new)
+                    return
+        out.append(op)
+        for q in op.qubits:
+            stacks.setdefault(q, []).append(len(out) - 1)
+
+    for op in ops:
+        push(op)
+    return [op for op in out if op is not None]
+
+
+def _profitable(merged, *parts):
+    # A merge pays unless it turns cheap diagonal/permutation kernels into a dense product
+    return matrix_kind(merged) != "dense" or any(gate_kind(op) == "dense" for op in parts)
+
+
+def fuse_gates(ops):
+    """
+    Gate fusion: every run of single-qubit gates on a wire becomes one 2x2
+    unitary, runs next to a two-qubit gate are absorbed into its 4x4 block
+    (before it, or after it when nothing else touches the wire later), and
+    consecutive two-qubit gates on the same pair merge into one block. A
+    structured two-qubit gate (diagonal or permutation) only absorbs or
+    merges when the result keeps its cheap kernel. Any other op (MEASURE)
+    is a barrier on its wires. Returns (ops, stats) where stats counts the
+    statevector sweeps before and after.
+    """
+    out = []
+    pending = {}  # qubit -> (matrix, [source ops]) not yet emitted
+    last = {}     # qubit -> index in out of the last op touching it
+
+    def flush(q):
+        matrix, sources = pending.pop(q)
+        out.append(sources[0] if len(sources) == 1 else _fused((q,), matrix))
+        last[q] = len(out) - 1
+
+    for op in ops:
+        if isinstance(op.theta, np.ndarray):
+            kind = None  # swept rotations stay as they are
+        elif op.name in SINGLE_QUBIT_GATES or op.name == "FUSED" and len(op.qubits) == 1:
+            kind = 1
+        elif op.name in TWO_QUBIT_GATES or op.name == "FUSED":
+            kind = 2
+        else:
+            kind = None
+
+        if kind == 1:
+            q = op.qubits[0]
+            matrix, sources = pending.get(q, (np.eye(2, dtype=complex), []))
+            pending[q] = (gate_matrix(op) @ matrix, sources + [op])
+        elif kind == 2:
+            a, b = op.qubits
+            block = gate_matrix(op)
+            absorbed = [q for q in (a, b) if q in pending]
+            if absorbed:
+                pa = pending.get(a, (np.eye(2),))[0]
+                pb = pending.get(b, (np.eye(2),))[0]
+                merged = block @ np.kron(pa, pb)
+                if _profitable(merged, op):
+                    block = merged
+                    for q in absorbed:
+                        del pending[q]
+                else:
+                    for q in absorbed:
+                        flush(q)
+                    absorbed = []
+            current = op if not absorbed else _fused((a, b), block)
+            j = last.get(a)
+            if j is not None and j == last.get(b) and len(out[j].qubits) == 2:
+                prev = out[j]
+                if prev.qubits != (a, b):
+                    block = _SWAP @ block @ _SWAP
+                merged = block @ gate_matrix(prev)
+                if _profitable(merged, prev, current):
+                    out[j] = _fused(prev.qubits, merged)
+                    continue
+            out.append(current)
+            last[a] = last[b] = len(out) - 1
+        else:
+            for q in op.qubits:
+                if q in pending:
+                    flush(q)
+            out.append(op)
+            for q in op.qubits:
+                last[q] = len(out) - 1
+
+    # Trailing runs fold into the last block on their wire when there is one:
+    # nothing after it touches the wire, so the gate commutes to just after it
+    for q in sorted(pending):
+        j = last.get(q)
+        if j is not None and len(out[j].qubits) == 2:
+            block = out[j]
+            matrix = pending[q][0]
+            post = np.kron(matrix, np.eye(2)) if block.qubits[0] == q else np.kron(np.eye(2), matrix)
+            merged = post @ gate_matrix(block)
+            if _profitable(merged, block):
+                del pending[q]
+                out[j] = _fused(block.qubits, merged)
+                continue
+        flush(q)
+
+    gates = sum(op.name != "MEASURE" for op in ops)
+    sweeps = sum(op.name != "MEASURE" for op in out)
+    return out, {"gates": gates, "sweeps": sweeps, "saved": gates - sweeps}
+
+
+def fuse_for_width(n, ops):
+    """
+    fuse_gates() for an n-qubit state. Narrower states keep their ops as
+    they are, with stats reporting one sweep per gate.
+    """
+    if n < FUSION_MIN_QUBITS:
+        gates = sum(op.name != "MEASURE" for op in ops)
+        return list(ops), {"gates": gates, "sweeps": gates, "saved": 0}
+    return fuse_gates(ops)
@@ -1,8 +1,18 @@
 import os
 import json
-from flask import jsonify, request, send_from_directory, render_template, redirect, url_for, session, flash, make_response
+from flask import jsonify, request, send_from_directory, render_template, redirect, url_for, session, flash, make_response, stream_with_context
 from werkzeug.security import check_password_hash
-from .simulate import simulate
+import sqlite3
+from .cache import PrefixStateCache, ResultCache, circuit_key
+from .encoding import negotiate
+from . import outofcore
+from .statevector import set_threads
+from .store import SharedResultStore
+from .variational import compile_program, optimize
+from .simulate import (
+    simulate, simulate_batch, simulate_sweep, simulate_expectation, simulate_gradient, simulate_trace,
+    is_deterministic, sparse_options,
+)
 from .models import (
     get_courses, get_lessons, get_course_by_slug, get_lesson_by_slug, upsert_progress,
     create_user, get_user_by_email, get_quiz_for_lesson, get_quiz_questions, 
@@ -18,6 +28,49 @@ def register_routes(app):
         except Exception:
             return row
 
+    result_cache = ResultCache(
+        max_entries=app.config.get("SIM_CACHE_ENTRIES", 512),
+        max_bytes=app.config.get("SIM_CACHE_BYTES", 32 * 1024 * 1024),
+    )
+    app.extensions["sim_result_cache"] = result_cache
+    prefix_cache = PrefixStateCache(max_bytes=app.config.get("SIM_PREFIX_BYTES", 64 * 1024 * 1024))
+    app.extensions["sim_prefix_cache"] = prefix_cache
+    set_threads(app.config.get("SIM_THREADS", 0), app.config.get("SIM_THREAD_MIN_QUBITS", 18))
+    outofcore.configure(app.config.get("SIM_SCRATCH_DIR"), app.config.get("SIM_SCRATCH_QUOTA", outofcore.DEFAULT_QUOTA))
+
+    def shared_store():
+        # Opened lazily so each worker connects after Passenger forks it and
+        # tests can point SIM_STORE_PATH elsewhere after create_app()
+        if "sim_shared_store" not in app.extensions:
+            store = None
+            path = app.config.get("SIM_STORE_PATH")
+            if path:
+                try:
+                    store = SharedResultStore(
+                        path,
+                        ttl=app.config.get("SIM_STORE_TTL", 24 * 3600),
+                        max_bytes=app.config.get("SIM_STORE_BYTES", 256 * 1024 * 1024),
+                    )
+                except (sqlite3.Error, OSError):
+                    store = None
+            app.extensions["sim_shared_store"] = store
+        return app.extensions["sim_shared_store"]
+
+    def cached_body(key):
+        body = result_cache.get(key)
+        if body is None:
+            store = shared_store()
+            body = store.get(key) if store else None
+            if body is not None:
+                result_cache.put(key, body)
+        return body
+
+    def remember(key, body):
+        result_cache.put(key, body)
+        store = shared_store()
+        if store:
+            store.put(key, body)
+
     @app.context_processor
     def inject_user():
         return dict(user=session.get('username'), is_superuser=session.get('is_superuser'))
@@ -101,11 +154,111 @@ def register_routes(app):
         payload = request.get_json(silent=True) or {}
         shots = int(payload.get("shots", 0))
         data = payload.get("circuit", {})
+        backend = payload.get("backend") or app.config.get("SIM_BACKEND", "numpy")
+        mode = payload.get("mode") or "simulate"
+        try:
+            encoding, dtype = negotiate(payload.get("format"), payload.get("dtype"), request.accept_mimetypes)
+            sparse = sparse_options(payload.get("threshold"), payload.get("top_k"), bool(payload.get("nonzero")))
+            reduced = payload.get("reduced") or None
+            if mode == "simulate":
+                compute = lambda: simulate(
+                    data, shots, backend=backend, encoding=encoding, dtype=dtype, sparse=sparse, reduced=reduced,
+                    prefix_cache=prefix_cache, precision=payload.get("precision"),
+                    max_bond=payload.get("max_bond"), bitstrings=payload.get("bitstrings"),
+                )
+                deterministic = is_deterministic(data, shots, backend)
+            elif mode == "sweep":
+                compute = lambda: simulate_sweep(data, backend=backend)
+                deterministic = True
+            elif mode == "expectation":
+                compute = lambda: simulate_expectation(data, payload.get("observable"), backend=backend)
+                deterministic = True
+            elif mode == "trace":
+                compute = lambda: simulate_trace(
+                    data, bool(payload.get("amplitudes")), bool(payload.get("bloch")), payload.get("threshold"),
+                    encoding=encoding, dtype=dtype, top_k=payload.get("top_k"),
+                )
+                deterministic = True
+            elif mode == "gradient":
+                method = payload.get("method") or "adjoint"
+                compute = lambda: simulate_gradient(data, payload.get("observable"), method, backend=backend)
+                deterministic = True
+            else:
+                raise ValueError(f"Unknown mode: {mode}")
+
+            # Only deterministic results are cached; sampled ones must stay random
+            key = None
+            if deterministic:
+                # Gradients and traces report individual gates and steps, so they
+                # are keyed on the circuit exactly as drawn
+                per_gate = mode in ("gradient", "trace")
+                key = circuit_key(
+                    data, simplify=not per_gate, mode=mode, shots=shots, backend=backend,
+                    format=encoding, dtype=dtype, sparse=sparse, reduced=reduced,
+                    observable=payload.get("observable"), method=payload.get("method"),
+                    steps=[g.get("step") for g in data.get("gates", [])] if per_gate else None,
+                    amplitudes=payload.get("amplitudes"), bloch=payload.get("bloch"),
+                    precision=payload.get("precision"), max_bond=payload.get("max_bond"),
+                    bitstrings=payload.get("bitstrings"),
+                )
+                body = cached_body(key)
+                if body is not None:
+                    resp = app.response_class(body, mimetype="application/json")
+                    resp.vary.add("Accept")
+                    return resp
+            resp = jsonify(compute())
+            resp.vary.add("Accept")
+            if key:
+                remember(key, resp.get_data())
+            return resp
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.post("/api/simulate/batch")
+    def api_simulate_batch():
+        payload = request.get_json(silent=True) or {}
+        circuits = payload.get("circuits")
+        if not isinstance(circuits, list):
+            return jsonify({"error": "circuits must be a list"}), 400
+        backend = payload.get("backend") or app.config.get("SIM_BACKEND", "numpy")
+        try:
+            shots = int(payload.get("shots", 0))
+            results = simulate_batch(circuits, shots, backend=backend, precision=payload.get("precision"))
+            return jsonify({"results": results})
+        except Exception as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.post("/api/optimize")
+    def api_optimize():
+        payload = request.get_json(silent=True) or {}
         try:
-            res = simulate(data, shots)
-            return jsonify(res)
+            program = compile_program(payload.get("problem"), payload.get("ansatz"), payload.get("p", 1))
+            records = optimize(
+                program,
+                payload.get("optimizer") or "adam",
+                payload.get("iterations", 100),
+                learning_rate=payload.get("learning_rate"),
+                seed=payload.get("seed"),
+                params=payload.get("params"),
+            )
         except Exception as e:
             return jsonify({"error": str(e)}), 400
+        if payload.get("stream") is False:
+            history = list(records)
+            return jsonify(dict(history[-1], history=[r["energy"] for r in history[:-1]]))
+        # One JSON record per line as each iteration finishes
+        lines = (json.dumps(record) + "\n" for record in records)
+        return app.response_class(stream_with_context(lines), mimetype="application/x-ndjson")
+
+    @app.get("/api/simulate/stats")
+    def api_simulate_stats():
+        store = shared_store()
+        return jsonify({
+            "cache": result_cache.stats(),
+            "store": store.stats() if store else None,
+            "prefix": prefix_cache.stats(),
+            "scratch": outofcore.usage(),
+        })
 
     @app.post("/api/progress")
     def api_progress():
@@ -2,98 +2,877 @@ import json
 import cirq
 import numpy as np
 
-def circuit_from_json(data):
-    n = data.get("qubits", 1)
+from . import gradients, mps, observables, outofcore, passes, stabilizer, statevector
+from .encoding import encode_array, encode_statevector
+from .circuit import parse_circuit, parse_moments, measured_qubits, sweep_points, defer_measurements
+
+# "numpy" is the built-in engine; "cirq" is kept as the reference backend.
+BACKENDS = ("numpy", "cirq")
+DEFAULT_BACKEND = "numpy"
+
+# simulate() also runs on "memmap": the numpy kernels streaming a state kept in
+# a scratch file (see app.outofcore), for widths that don't fit in RAM, and on
+# "mps": a bond-capped matrix product state (see app.mps) for wide circuits
+# with little entanglement
+SIMULATE_BACKENDS = BACKENDS + ("memmap", "mps")
+
+# Upper bound on the bitstrings one MPS request may ask amplitudes for
+MAX_AMPLITUDE_QUERIES = 1024
+
+# Full 2^n probability lists are only returned up to this width; wider
+# Clifford circuits are answered from the stabilizer tableau instead.
+MAX_DENSE_QUBITS = 20
+
+# "nonzero" sparse results drop outcomes at or below this probability
+NONZERO_EPSILON = 1e-12
+
+# reduced= values: per-qubit Bloch vectors and marginals, optionally plus pairwise marginals
+REDUCED_MODES = ("qubits", "pairs")
+
+# Amplitude precisions for simulate(). Without an explicit choice, states
+# wider than SINGLE_PRECISION_QUBITS use complex64, halving memory and
+# bandwidth; narrower ones keep complex128.
+PRECISIONS = {"complex64": np.complex64, "complex128": np.complex128}
+SINGLE_PRECISION_QUBITS = 16
+
+# Upper bound on the number of step records one trace may return
+MAX_TRACE_STEPS = 512
+
+# Upper bound on the outcomes a whole trace may return, summed over its steps.
+# Above TRACE_NONZERO_QUBITS a trace without threshold or top_k keeps only the
+# TRACE_TOP_K most likely outcomes per step instead of every nonzero one.
+MAX_TRACE_ENTRIES = 2 ** 18
+TRACE_NONZERO_QUBITS = 10
+TRACE_TOP_K = 256
+
+# Above this many shots only the counts histogram is returned, drawn with a
+# single multinomial over the final distribution instead of per-shot records
+MAX_RAW_SHOTS = 10000
+
+# Upper bound on the shots one request may ask for. Paths without a single
+# multinomial draw sample and count at most SHOT_CHUNK shots at a time, and
+# collapsing one trajectory per shot is capped at MAX_TRAJECTORY_SHOTS.
+MAX_SHOTS = 10 ** 7
+SHOT_CHUNK = 2 ** 16
+MAX_TRAJECTORY_SHOTS = 4096
+
+# Clifford circuits whose readout support has at most this many outcomes get
+# their counts from one multinomial over it, without building a statevector
+MAX_CLIFFORD_SUPPORT = 2 ** 16
+
+# simulate_batch limits: circuits per request, and amplitudes held at once
+# when a group of same-width circuits is evolved as one stacked array
+MAX_BATCH_SIZE = 256
+BATCH_AMPLITUDE_BUDGET = 2 ** 22
+
+
+def _to_cirq(op, qs):
+    t = op.name
+    if t == "X":
+        return cirq.X(qs[op.qubits[0]])
+    if t == "Y":
+        return cirq.Y(qs[op.qubits[0]])
+    if t == "Z":
+        return cirq.Z(qs[op.qubits[0]])
+    if t == "H":
+        return cirq.H(qs[op.qubits[0]])
+    if t == "S":
+        return cirq.S(qs[op.qubits[0]])
+    if t == "T":
+        return cirq.T(qs[op.qubits[0]])
+    if t == "RX":
+        return cirq.rx(op.theta)(qs[op.qubits[0]])
+    if t == "RY":
+        return cirq.ry(op.theta)(qs[op.qubits[0]])
+    if t == "RZ":
+        return cirq.rz(op.theta)(qs[op.qubits[0]])
+    if t == "CNOT":
+        return cirq.CNOT(qs[op.qubits[0]], qs[op.qubits[1]])
+    if t == "CZ":
+        return cirq.CZ(qs[op.qubits[0]], qs[op.qubits[1]])
+    if t == "SWAP":
+        return cirq.SWAP(qs[op.qubits[0]], qs[op.qubits[1]])
+    if t == "MEASURE":
+        return cirq.measure(qs[op.qubits[0]], key=f"m{op.qubits[0]}")
+    raise ValueError(f"Unsupported gate: {t}")
+
+
+def _cirq_moments(n, moments):
     qs = [cirq.LineQubit(i) for i in range(n)]
-    c = cirq.Circuit()
-    for g in data.get("gates", []):
-        t = g.get("type")
-        q = g.get("target", 0)
-        ctr = g.get("control")
-        p = g.get("params", {})
-        if t == "X":
-            c.append(cirq.X(qs[q]))
-        elif t == "Y":
-            c.append(cirq.Y(qs[q]))
-        elif t == "Z":
-            c.append(cirq.Z(qs[q]))
-        elif t == "H":
-            c.append(cirq.H(qs[q]))
-        elif t == "S":
-            c.append(cirq.S(qs[q]))
-        elif t == "T":
-            c.append(cirq.T(qs[q]))
-        elif t == "RX":
-            c.append(cirq.rx(p.get("theta", 0))(qs[q]))
-        elif t == "RY":
-            c.append(cirq.ry(p.get("theta", 0))(qs[q]))
-        elif t == "RZ":
-            c.append(cirq.rz(p.get("theta", 0))(qs[q]))
-        elif t == "CNOT" and ctr is not None:
-            c.append(cirq.CNOT(qs[ctr], qs[q]))
-        elif t == "CZ" and ctr is not None:
-            c.append(cirq.CZ(qs[ctr], qs[q]))
-        elif t == "SWAP":
-            c.append(cirq.SWAP(qs[q], qs[p.get("other", q)]))
-        elif t == "MEASURE":
-            c.append(cirq.measure(qs[q], key=f"m{q}"))
-    return c, qs
-
-def simulate(data, shots=0):
+    return cirq.Circuit(cirq.Moment(_to_cirq(op, qs) for op in ops) for ops in moments), qs
+
+
+def _cirq_circuit(n, ops):
+    # Earliest-moment layering in one pass, instead of cirq.Circuit.append's
+    # per-gate search back through the circuit
+    moments = []
+    depth = [0] * n
+    for op in ops:
+        k = max(depth[q] for q in op.qubits)
+        if k == len(moments):
+            moments.append([])
+        moments[k].append(op)
+        for q in op.qubits:
+            depth[q] = k + 1
+    return _cirq_moments(n, moments)
+
+
+def circuit_from_json(data):
+    """The editor's circuit as a cirq.Circuit whose moments are its step columns."""
+    n, moments = parse_moments(data)
+    return _cirq_moments(n, [ops for _, ops in moments])
+
+
+def probabilities_from_shots(shot_matrix):
+    """Histogram of a (shots, n_qubits) bit matrix over all 2^n basis states."""
+    shots, n_qubits = shot_matrix.shape
+    probs = [0.0] * (2 ** n_qubits)
+
+    # Convert bits to integer indices
+    # weights: [2^(n-1), 2^(n-2), ..., 1]
+    weights = 2 ** np.arange(n_qubits - 1, -1, -1)
+    indices = shot_matrix.dot(weights)
+
+    # Count occurrences
+    unique, counts = np.unique(indices, return_counts=True)
+    for idx, count in zip(unique, counts):
+        probs[idx] = count / shots
+    return probs
+
+
+def precision_dtype(precision, n):
+    """The NumPy complex dtype for a precision name, or the default for width n."""
+    if precision is None:
+        return np.complex64 if n > SINGLE_PRECISION_QUBITS else np.complex128
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    return PRECISIONS[precision]
+
+
+def _cirq_shots(data, shots, precision=None):
+    c, qs = circuit_from_json(data)
+    sim = cirq.Simulator(dtype=precision_dtype(precision, len(qs)))
+    res = sim.run(c, repetitions=shots)
+    n_qubits = len(qs)
+
+    # Create a matrix of shape (shots, n_qubits)
+    # Initialize with zeros (default for unmeasured qubits)
+    shot_matrix = np.zeros((shots, n_qubits), dtype=int)
+    for q in range(n_qubits):
+        key = f"m{q}"
+        if key in res.measurements:
+            shot_matrix[:, q] = res.measurements[key].flatten()
+    return shot_matrix, sorted(int(k[1:]) for k in res.measurements)
+
+
+def _cirq_statevector(data, precision=None):
+    c, qs = circuit_from_json(data)
+    sim = cirq.Simulator(dtype=precision_dtype(precision, len(qs)))
+    # qubit_order=qs ensures all qubits are included in the state vector
+    return sim.simulate(c, qubit_order=qs).final_state_vector
+
+
+def _bitstring_counts(shot_matrix, normalize=True):
+    shots, n_qubits = shot_matrix.shape
+    if n_qubits < 63:
+        # Count integer indices rather than unique rows; much cheaper for many shots
+        weights = 2 ** np.arange(n_qubits - 1, -1, -1, dtype=np.int64)
+        values, counts = np.unique(shot_matrix.dot(weights), return_counts=True)
+        keys = [format(int(v), f"0{n_qubits}b") for v in values]
+    else:
+        # Rows as ASCII '0'/'1' byte strings: one sort, no per-row Python joins
+        chars = np.ascontiguousarray(shot_matrix + ord("0"), dtype=np.uint8)
+        rows, counts = np.unique(chars.view(f"S{n_qubits}").ravel(), return_counts=True)
+        keys = [row.decode() for row in rows.tolist()]
+    if normalize:
+        return {k: c / shots for k, c in zip(keys, counts.tolist())}
+    return dict(zip(keys, counts.tolist()))
+
+
+def _shots_result(shot_matrix, measured):
+    # Counts are keyed by n-bit strings (q0 first, unmeasured qubits read 0);
+    # per-shot records keep cirq's {"m<q>": [[bit], ...]} layout
+    shots = shot_matrix.shape[0]
+    res = {"shots": shots, "counts": _bitstring_counts(shot_matrix, normalize=False)}
+    if shots <= MAX_RAW_SHOTS:
+        # Shared [0]/[1] rows: allocating one list per shot dominates otherwise
+        rows = ([0], [1])
+        res.update({f"m{q}": [rows[b] for b in shot_matrix[:, q].tolist()] for q in measured})
+    return res
+
+
+def _shot_chunks(shots):
+    return [min(SHOT_CHUNK, shots - start) for start in range(0, shots, SHOT_CHUNK)]
+
+
+def _counted_shots_result(n, shots, chunks, measured):
+    """
+    _shots_result() over an iterable of (k, n) bit matrices of at most
+    SHOT_CHUNK shots each. Up to MAX_RAW_SHOTS that is one matrix and the
+    per-shot records are kept; above, only the counts are added up chunk by
+    chunk, each row packed from its measured columns alone.
+    """
+    if shots <= MAX_RAW_SHOTS:
+        return _shots_result(next(iter(chunks)), measured)
+    counts = {}
+    for shot_matrix in chunks:
+        for key, c in _bitstring_counts(shot_matrix[:, measured], normalize=False).items():
+            counts[key] = counts.get(key, 0) + c
+    if len(measured) == n:
+        return {"shots": shots, "counts": counts}
+    row = ["0"] * n
+    out = {}
+    for key, c in counts.items():
+        for q, b in zip(measured, key):
+            row[q] = b
+        out["".join(row)] = c
+    return {"shots": shots, "counts": out}
+
+
+def _resume_state(n, ops, prefix_cache, dtype=complex):
+    """
+    final_state() that starts from the longest prefix of ops found in
+    prefix_cache, fusing and applying only the remaining gates, and
+    checkpoints the state every prefix_cache.interval gates and at the end.
+    """
+    unitary = [op for op in ops if op.name != "MEASURE"]
+    keys = prefix_cache.prefix_keys(n, unitary, dtype)
+    k, psi = prefix_cache.longest(keys)
+    if psi is None:
+        psi = statevector.zero_state(n, dtype)
+    while k < len(unitary):
+        stop = min(len(unitary), (k // prefix_cache.interval + 1) * prefix_cache.interval)
+        if not psi.flags.writeable:
+            psi = psi.copy()  # cached checkpoints are frozen; the kernels work in place
+        psi = statevector.apply_ops(psi, passes.fuse_for_width(n, unitary[k:stop])[0])
+        k = stop
+        psi = np.ascontiguousarray(psi)
+        prefix_cache.put(keys[k], psi)
+    return psi.reshape(-1)
+
+
+def _dense_state(n, ops, prefix_cache=None, precision=None):
+    # The numpy engine's final state, with gates fused on wide states
+    dtype = precision_dtype(precision, n)
+    if prefix_cache is not None:
+        return _resume_state(n, ops, prefix_cache, dtype)
+    return statevector.final_state(n, passes.fuse_for_width(n, ops)[0], dtype)
+
+
+def _dense_sample_bits(n, ops, shots, precision=None):
+    total = defer_measurements(n, ops)[0]
+    if total > MAX_DENSE_QUBITS and shots > MAX_TRAJECTORY_SHOTS:
+        # Too many mid-circuit measurements to defer: every shot is its own run
+        raise ValueError(
+            f"Circuits whose deferred measurements need over {MAX_DENSE_QUBITS} qubits "
+            f"are limited to {MAX_TRAJECTORY_SHOTS} shots"
+        )
+    dtype = precision_dtype(precision, total)
+    return statevector.sample_bits(n, passes.fuse_for_width(n, ops)[0], shots, max_width=MAX_DENSE_QUBITS, dtype=dtype)
+
+
+def _multinomial_counts(shots, probs, label):
+    # Counts only: one multinomial draw costs the same for 1e3 or 1e7 shots
+    counts = np.random.default_rng().multinomial(shots, probs / probs.sum(dtype=float))
+    return {"shots": shots, "counts": {label(i): int(counts[i]) for i in np.flatnonzero(counts)}}
+
+
+def _numpy_shots_result(n, ops, shots, clifford, precision=None):
+    if shots > MAX_RAW_SHOTS:
+        total, unitary, readout = defer_measurements(n, ops)
+        if readout and clifford:
+            # Uniform over the readout wires' support, so small ones need no statevector
+            x0, basis = stabilizer.run(total, unitary).support()
+            x0, basis = stabilizer.project(x0, basis, list(readout.values()))
+            wires = {q: i for i, q in enumerate(readout)}
+            dist = stabilizer.readout_probabilities(x0, basis, n, wires, limit=MAX_CLIFFORD_SUPPORT)
+            if dist is not None:
+                return _multinomial_counts(shots, np.array(list(dist.values())), list(dist).__getitem__)
+        if readout and total <= MAX_DENSE_QUBITS:
+            probs = np.abs(_dense_state(total, unitary, precision=precision)) ** 2
+            probs = _readout_probabilities(n, total, probs, readout)
+            return _multinomial_counts(shots, probs, lambda i: format(i, f"0{n}b"))
+    if clifford:
+        draw, rng = stabilizer.sampler(n, ops), np.random.default_rng()
+        return _counted_shots_result(n, shots, (draw(k, rng) for k in _shot_chunks(shots)), measured_qubits(ops))
+    # Only unmeasured circuits and collapsing trajectories get here, so one draw
+    return _shots_result(_dense_sample_bits(n, ops, shots, precision), measured_qubits(ops))
+
+
+def _reduced_result(sv, probs, reduced):
+    # Per-qubit views computed server-side so clients need not fetch all 2^n amplitudes
+    probs = np.asarray(probs)
+    n = probs.size.bit_length() - 1
+    res = {"marginals": statevector.marginals(probs, n).tolist()}
+    if sv is not None:
+        res["bloch"] = statevector.bloch_vectors(sv, n).tolist()
+    if reduced == "pairs":
+        res["pair_marginals"] = [
+            {"qubits": list(pair), "probabilities": p.tolist()}
+            for pair, p in statevector.pair_marginals(probs, n).items()
+        ]
+    return res
+
+
+def _statevector_result(sv, encoding="json", dtype="float64", sparse=None, reduced=None):
+    probs = np.abs(sv) ** 2
+    extra = _reduced_result(sv, probs, reduced) if reduced else {}
+    if sparse:
+        return dict(_sparse_result(probs, sv, sparse, encoding, dtype), **extra)
+    if encoding == "base64":
+        return dict(statevector=encode_statevector(sv, dtype), probabilities=encode_array(probs, dtype), **extra)
+    # Convert complex state vector to string representation for JSON serialization
+    sv_serializable = [str(x) for x in sv.tolist()]
+    return dict(statevector=sv_serializable, probabilities=probs.tolist(), **extra)
+
+
+def _finish_probabilities(res, encoding, dtype, sparse=None, reduced=None):
+    # Shapes a probabilities-only result (measured circuits) like a statevector one
+    if res.get("probabilities") is None:
+        return res
+    if reduced:
+        res.update(_reduced_result(None, res["probabilities"], reduced))
+    if sparse:
+        return dict(res, **_sparse_result(res["probabilities"], None, sparse, encoding, dtype))
+    if encoding == "base64":
+        res["probabilities"] = encode_array(res["probabilities"], dtype)
+    elif isinstance(res["probabilities"], np.ndarray):
+        res["probabilities"] = res["probabilities"].tolist()
+    return res
+
+
+def sparse_options(threshold=None, top_k=None, nonzero=False):
+    """Validated sparse-result options, or None when none were requested."""
+    opts = {}
+    if threshold is not None:
+        threshold = float(threshold)
+        if threshold < 0:
+            raise ValueError("threshold must be non-negative")
+        opts["threshold"] = threshold
+    if top_k is not None:
+        top_k = int(top_k)
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        opts["top_k"] = top_k
+    if nonzero:
+        opts.setdefault("threshold", NONZERO_EPSILON)
+    return opts or None
+
+
+def _sparse_result(probs, sv, sparse, encoding, dtype):
+    """
+    Keeps only the significant outcomes: those above sparse["threshold"],
+    capped at the sparse["top_k"] most likely (found with argpartition, so
+    there is no full sort). Indices come back in ascending order, alongside
+    their probabilities and, when a statevector exists, amplitudes.
+    """
+    probs = np.asarray(probs)
+    top_k = sparse.get("top_k")
+    threshold = sparse.get("threshold")
+    if top_k and top_k < probs.size:
+        idx = np.argpartition(probs, -top_k)[-top_k:]
+        if threshold is not None:
+            idx = idx[probs[idx] > threshold]
+    elif threshold is not None:
+        idx = np.flatnonzero(probs > threshold)
+    else:
+        idx = np.arange(probs.size)
+    idx = np.sort(idx)
+    return _sparse_payload(probs.size, idx, probs[idx], None if sv is None else sv[idx],
+                           probs.sum(dtype=float), encoding, dtype)
+
+
+def _sparse_payload(num_states, idx, probs, amplitudes, total, encoding, dtype):
+    out = {
+        "num_states": int(num_states),
+        "indices": idx.tolist(),
+        "omitted_probability": float(max(0.0, total - probs.sum(dtype=float))),
+    }
+    if encoding == "base64":
+        out["probabilities"] = encode_array(probs, dtype)
+        if amplitudes is not None:
+            out["amplitudes"] = encode_statevector(amplitudes, dtype)
+    else:
+        out["probabilities"] = probs.tolist()
+        if amplitudes is not None:
+            out["amplitudes"] = [str(x) for x in amplitudes.tolist()]
+    return {"statevector": None, "probabilities": None, "sparse": out}
+
+
+def _stabilizer_result(n, ops):
+    # Exact Clifford statistics without a 2^n vector: the support of the
+    # output distribution plus each qubit's probability of reading 1
+    x0, basis = stabilizer.run(n, ops).support()
+    return {
+        "statevector": None,
+        "probabilities": None,
+        "outcomes": stabilizer.outcome_probabilities(x0, basis),
+        "qubit_probabilities": stabilizer.qubit_probabilities(x0, basis),
+    }
+
+
+def _has_measure(data):
+    return any(g.get("type") == "MEASURE" for g in data.get("gates", []))
+
+
+def _readout_probabilities(n, total, probs, readout):
+    """
+    Born-rule distribution of the measured wires laid out like the sampled
+    histogram: qubit q shows the bit of wire readout[q], unmeasured qubits read 0.
+    """
+    measured = sorted(readout)
+    wires = [readout[q] for q in measured]
+    marginal = probs.reshape((2,) * total).sum(axis=tuple(a for a in range(total) if a not in wires))
+    # The marginal keeps its axes in wire order; reorder them to qubit order
+    order = sorted(wires)
+    marginal = np.transpose(marginal, [order.index(w) for w in wires])
+    out = np.zeros((2,) * n)
+    out[tuple(slice(None) if q in readout else 0 for q in range(n))] = marginal
+    return out.reshape(-1)
+
+
+def _exact_measurement_plan(n, ops):
+    """
+    How to get exact shots=0 measurement statistics, or None when only sampling
+    will do. Mid-circuit measurements are deferred onto ancilla wires, which
+    is affordable for the dense engine while the total width stays small and
+    always affordable for the tableau.
+    """
+    total, unitary, readout = defer_measurements(n, ops)
+    if total <= MAX_DENSE_QUBITS:
+        return "dense", total, unitary, readout
+    if stabilizer.is_clifford(unitary):
+        return "stabilizer", total, unitary, readout
+    return None
+
+
+def _exact_measurement_result(n, plan, prefix_cache=None, precision=None):
+    engine, total, unitary, readout = plan
+    if engine == "dense":
+        probs = np.abs(_dense_state(total, unitary, prefix_cache, precision)) ** 2
+        return {"probabilities": _readout_probabilities(n, total, probs, readout), "statevector": None}
+    x0, basis = stabilizer.run(total, unitary).support()
+    outcomes = stabilizer.readout_probabilities(x0, basis, n, readout)
+    if outcomes is None:
+        return None
+    if n > MAX_DENSE_QUBITS:
+        return {"probabilities": None, "statevector": None, "outcomes": outcomes}
+    probs = [0.0] * (2 ** n)
+    for bits, p in outcomes.items():
+        probs[int(bits, 2)] = p
+    return {"probabilities": probs, "statevector": None}
+
+
+def is_deterministic(data, shots=0, backend=DEFAULT_BACKEND):
+    """Whether simulate() returns the same result every time for this request."""
+    if shots:
+        return False
+    if not _has_measure(data):
+        return True
+    if backend != "numpy":
+        return False
+    n, ops = parse_circuit(data)
+    plan = _exact_measurement_plan(n, ops)
+    # A stabilizer plan can still fall back to sampling on a huge support
+    return plan is not None and plan[0] == "dense"
+
+
+def simulate(data, shots=0, backend=DEFAULT_BACKEND, encoding="json", dtype="float64", sparse=None,
+             reduced=None, prefix_cache=None, precision=None, max_bond=None, bitstrings=None):
+    """
+    Runs a circuit from the editor's JSON. encoding/dtype choose how dense
+    statevector and probability arrays are serialized (see app.encoding), and
+    sparse (from sparse_options) trims them to the significant outcomes.
+    reduced ("qubits" or "pairs") adds per-qubit marginals and Bloch vectors,
+    plus pairwise marginals for "pairs". With a cache.PrefixStateCache, exact
+    dense runs resume from the longest recently simulated gate prefix.
+    precision ("complex64" or "complex128", see PRECISIONS) sets the amplitude
+    type on every backend; by default it depends on the width. The "mps"
+    backend caps bonds at max_bond and answers amplitude queries for
+    bitstrings, reporting bond dimensions and truncation error under "mps".
+    """
+    if backend not in SIMULATE_BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if precision is not None and precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    if reduced is True:
+        reduced = "qubits"
+    if reduced and reduced not in REDUCED_MODES:
+        raise ValueError(f"Unknown reduced mode: {reduced}")
+    if shots > MAX_SHOTS:
+        raise ValueError(f"At most {MAX_SHOTS} shots per run")
+    if backend == "memmap":
+        return _memmap_result(data, shots, encoding, dtype, sparse, reduced, precision)
+    if backend == "mps":
+        return _mps_result(data, shots, encoding, dtype, sparse, reduced, precision, max_bond, bitstrings)
+
+    if backend == "numpy":
+        n, ops = parse_circuit(data)
+        ops = passes.simplify_gates(ops)
+        clifford = stabilizer.is_clifford(ops)
+
     # Check for measurement gates
-    has_measure = any(g.get("type") == "MEASURE" for g in data.get("gates", []))
-    
-    # If measurements exist and no specific shot count requested, 
-    # we switch to sampling mode to show probabilities of outcomes
+    has_measure = _has_measure(data)
+
+    # With measurements and no shot count requested, the numpy backend reports
+    # exact Born-rule probabilities of the measurement records; the cirq
+    # reference backend (and circuits too wide to defer) sample 1024 shots
+    if has_measure and shots == 0 and backend == "numpy":
+        plan = _exact_measurement_plan(n, ops)
+        if plan is not None:
+            res = _exact_measurement_result(n, plan, prefix_cache, precision)
+            if res is not None:
+                return _finish_probabilities(res, encoding, dtype, sparse, reduced)
+
     if has_measure and shots == 0:
         shots = 1024
         run_sampling_for_probs = True
     else:
         run_sampling_for_probs = False
 
-    c, qs = circuit_from_json(data)
-    
     if shots and shots > 0:
+        if not run_sampling_for_probs:
+            if backend == "cirq":
+                n, ops = parse_circuit(data)
+                chunks = (_cirq_shots(data, k, precision)[0] for k in _shot_chunks(shots))
+                return _counted_shots_result(n, shots, chunks, measured_qubits(ops))
+            return _numpy_shots_result(n, ops, shots, clifford, precision)
+
+        if backend == "cirq":
+            shot_matrix, _ = _cirq_shots(data, shots, precision)
+        elif clifford:
+            shot_matrix = stabilizer.sample_bits(n, ops, shots)
+        else:
+            shot_matrix = _dense_sample_bits(n, ops, shots, precision)
+
+        # Convert raw measurement counts to probabilities histogram; sampled_shots
+        # tells clients these are estimates, not exact Born-rule probabilities
+        if shot_matrix.shape[1] > MAX_DENSE_QUBITS:
+            return {"probabilities": None, "statevector": None, "outcomes": _bitstring_counts(shot_matrix)}
+        res = {"probabilities": probabilities_from_shots(shot_matrix), "statevector": None, "sampled_shots": len(shot_matrix)}
+        return _finish_probabilities(res, encoding, dtype, sparse, reduced)
+
+    if backend == "cirq":
+        sv = _cirq_statevector(data, precision)
+    elif clifford and n > MAX_DENSE_QUBITS:
+        return _stabilizer_result(n, ops)
+    else:
+        # Fusion stats always describe the whole circuit, so the cached body
+        # does not depend on which prefixes happened to be checkpointed
+        fused, fusion = passes.fuse_for_width(n, ops)
+        if prefix_cache is not None:
+            sv = _resume_state(n, ops, prefix_cache, precision_dtype(precision, n))
+        else:
+            sv = statevector.final_state(n, fused, precision_dtype(precision, n))
+        return dict(_statevector_result(sv, encoding, dtype, sparse, reduced), fusion=fusion)
+    return _statevector_result(sv, encoding, dtype, sparse, reduced)
+
+
+def _memmap_result(data, shots, encoding, dtype, sparse, reduced, precision):
+    """
+    simulate() on the out-of-core engine. Measurements are deferred onto
+    ancilla wires and sampled from the final state (1024 shots when none are
+    requested); states wider than MAX_DENSE_QUBITS are only reported sparsely,
+    with at most outofcore.MAX_SIGNIFICANT outcomes.
+    """
+    n, ops = parse_circuit(data)
+    total, unitary, readout = defer_measurements(n, passes.simplify_gates(ops))
+    if not shots and not readout and total > MAX_DENSE_QUBITS:
+        if not sparse:
+            raise ValueError(f"States over {MAX_DENSE_QUBITS} qubits need a threshold or top_k")
+        if reduced:
+            raise ValueError(f"Reduced views are limited to {MAX_DENSE_QUBITS} qubits")
+    with outofcore.ScratchState(total, precision_dtype(precision, total)) as state:
+        outofcore.apply_ops(state.array, passes.fuse_for_width(total, unitary)[0])
+        if shots or readout:
+            idx = outofcore.sample_indices(state.array, shots or 1024, np.random.default_rng())
+
+            def bits(idx):
+                shot_matrix = np.zeros((idx.size, n), dtype=int)
+                for q, wire in readout.items():
+                    shot_matrix[:, q] = (idx >> (total - 1 - wire)) & 1
+                return shot_matrix
+
+            if shots:
+                chunks = (bits(idx[start:start + SHOT_CHUNK]) for start in range(0, shots, SHOT_CHUNK))
+                return _counted_shots_result(n, shots, chunks, measured_qubits(ops))
+            shot_matrix = bits(idx)
+            if n > MAX_DENSE_QUBITS:
+                return {"probabilities": None, "statevector": None, "outcomes": _bitstring_counts(shot_matrix)}
+            res = {"probabilities": probabilities_from_shots(shot_matrix), "statevector": None, "sampled_shots": len(shot_matrix)}
+            return _finish_probabilities(res, encoding, dtype, sparse, reduced)
+        if total <= MAX_DENSE_QUBITS:
+            return _statevector_result(np.array(state.array).reshape(-1), encoding, dtype, sparse, reduced)
+        idx, amplitudes, norm = outofcore.significant(state.array, sparse.get("threshold"), sparse.get("top_k"))
+        probs = np.abs(amplitudes) ** 2
+        return _sparse_payload(1 << total, idx, probs, amplitudes, norm, encoding, dtype)
+
+
+def _mps_result(data, shots, encoding, dtype, sparse, reduced, precision, max_bond, bitstrings):
+    """
+    simulate() on the MPS engine, with measurements deferred onto ancilla
+    wires and sampled (1024 shots when none are requested). Unmeasured
+    circuits return the dense statevector up to MAX_DENSE_QUBITS; beyond
+    that, only the amplitudes of the requested bitstrings.
+    """
+    n, ops = parse_circuit(data)
+    total, unitary, readout = defer_measurements(n, passes.simplify_gates(ops))
+    queries = _amplitude_queries(bitstrings, n)
+    if queries and readout:
+        raise ValueError("Amplitude queries need a circuit without measurements")
+    state = mps.MPS(total, int(max_bond or mps.DEFAULT_BOND), precision_dtype(precision, total))
+    state.apply_ops(passes.fuse_gates(unitary)[0])
+    info = {"mps": state.info()}
+    if shots or readout:
+        rng = np.random.default_rng()
+
+        def draw(k):
+            bits = state.sample(k, rng)
+            shot_matrix = np.zeros((k, n), dtype=int)
+            for q, wire in readout.items():
+                shot_matrix[:, q] = bits[:, wire]
+            return shot_matrix
+
+        if shots:
+            chunks = (draw(k) for k in _shot_chunks(shots))
+            return dict(_counted_shots_result(n, shots, chunks, measured_qubits(ops)), **info)
+        shot_matrix = draw(1024)
+        if n > MAX_DENSE_QUBITS:
+            return {"probabilities": None, "statevector": None, "outcomes": _bitstring_counts(shot_matrix), **info}
+        res = {"probabilities": probabilities_from_shots(shot_matrix), "statevector": None, "sampled_shots": len(shot_matrix)}
+        return dict(_finish_probabilities(res, encoding, dtype, sparse, reduced), **info)
+    if queries:
+        amplitudes = {q: state.amplitude([int(c) for c in q]) for q in queries}
+        return {
+            "statevector": None,
+            "probabilities": None,
+            "amplitudes": {q: str(a) for q, a in amplitudes.items()},
+            "amplitude_probabilities": {q: abs(a) ** 2 for q, a in amplitudes.items()},
+            **info,
+        }
+    if n > MAX_DENSE_QUBITS:
+        return {"statevector": None, "probabilities": None, **info}
+    return dict(_statevector_result(state.statevector(), encoding, dtype, sparse, reduced), **info)
+
+
+def _amplitude_queries(bitstrings, n):
+    if bitstrings is None:
+        return []
+    if not isinstance(bitstrings, list) or len(bitstrings) > MAX_AMPLITUDE_QUERIES:
+        raise ValueError(f"bitstrings must be a list of at most {MAX_AMPLITUDE_QUERIES} strings")
+    for b in bitstrings:
+        if not isinstance(b, str) or len(b) != n or set(b) - {"0", "1"}:
+            raise ValueError(f"Invalid bitstring {b!r} for {n} qubits")
+    return bitstrings
+
+
+def simulate_batch(circuits, shots=0, backend=DEFAULT_BACKEND, precision=None):
+    """
+    simulate() for a list of circuits, returning results in the same order.
+    Deterministic numpy-backend circuits of equal width are stacked and
+    evolved together, fused and in the same precision as simulate() would
+    use; everything else goes through simulate() one by one. A failing
+    circuit yields {"error": ...} in its slot instead of failing the whole
+    batch.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if precision is not None and precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+    if len(circuits) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch too large: at most {MAX_BATCH_SIZE} circuits")
+
+    results = [None] * len(circuits)
+    groups = {}
+    for i, data in enumerate(circuits):
+        try:
+            if not isinstance(data, dict):
+                raise ValueError("Each circuit must be an object")
+            # Only plain statevector requests can share a stacked evolution
+            if backend == "numpy" and not shots and not _has_measure(data):
+                n, ops = parse_circuit(data)
+                if n <= MAX_DENSE_QUBITS:
+                    groups.setdefault(n, []).append((i, passes.fuse_for_width(n, passes.simplify_gates(ops))))
+                    continue
+            results[i] = simulate(data, shots, backend=backend, precision=precision)
+        except Exception as e:
+            results[i] = {"error": str(e)}
+
+    for n, members in groups.items():
+        chunk = max(1, BATCH_AMPLITUDE_BUDGET >> n)
+        for start in range(0, len(members), chunk):
+            part = members[start:start + chunk]
+            states = statevector.final_states(n, [ops for _, (ops, _) in part], precision_dtype(precision, n))
+            for (i, (_, fusion)), sv in zip(part, states):
+                results[i] = dict(_statevector_result(sv), fusion=fusion)
+    return results
+
+
+def _qubit_z_expectations(probs, n):
+    # <Z_q> = P(q=0) - P(q=1) for every row of a (points, 2^n) probability array
+    tensor = probs.reshape((probs.shape[0],) + (2,) * n)
+    cols = []
+    for q in range(n):
+        marginal = tensor.sum(axis=tuple(1 + a for a in range(n) if a != q))
+        cols.append(marginal[:, 0] - marginal[:, 1])
+    return np.stack(cols, axis=1)
+
+
+def simulate_sweep(data, backend=DEFAULT_BACKEND):
+    """
+    Evaluates a circuit whose RX/RY/RZ angles may be lists or linspace specs
+    ({"start", "stop", "num"}). All swept angles advance together, and the
+    numpy engine evaluates every point in one pass over a (points, 2^n) array.
+    MEASURE gates are ignored: the curves come from the final state.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    n, ops = parse_circuit(data, sweep=True)
+    points = sweep_points(ops)
+    if points << n > BATCH_AMPLITUDE_BUDGET:
+        raise ValueError("Sweep too large: reduce the number of points or qubits")
+
+    if backend == "cirq":
         sim = cirq.Simulator()
-        res = sim.run(c, repetitions=shots)
-        
-        if run_sampling_for_probs:
-            # Convert raw measurement counts to probabilities histogram
-            n_qubits = data.get("qubits", 1)
-            probs = [0.0] * (2 ** n_qubits)
-            
-            # We need to iterate over shots to reconstruct the state index
-            # res.measurements[key] is a numpy array of 0s and 1s
-            # We can vectorize this for performance using numpy
-            
-            # Create a matrix of shape (shots, n_qubits)
-            # Initialize with zeros (default for unmeasured qubits)
-            shot_matrix = np.zeros((shots, n_qubits), dtype=int)
-            
-            for q in range(n_qubits):
-                key = f"m{q}"
-                if key in res.measurements:
-                    shot_matrix[:, q] = res.measurements[key].flatten()
-            
-            # Convert bits to integer indices
-            # weights: [2^(n-1), 2^(n-2), ..., 1]
-            weights = 2 ** np.arange(n_qubits - 1, -1, -1)
-            indices = shot_matrix.dot(weights)
-            
-            # Count occurrences
-            unique, counts = np.unique(indices, return_counts=True)
-            for idx, count in zip(unique, counts):
-                probs[idx] = count / shots
-                
-            return {"probabilities": probs, "statevector": None}
-        
-        # Standard raw shots request
-        return {k: list(v) for k, v in res.measurements.items()}
-
-    sim = cirq.Simulator()
-    # qubit_order=qs ensures all qubits are included in the state vector
-    sv = sim.simulate(c, qubit_order=qs).final_state_vector
-    probs = np.abs(sv) ** 2
-    # Convert complex state vector to string representation for JSON serialization
-    sv_serializable = [str(x) for x in sv.tolist()]
-    return {"statevector": sv_serializable, "probabilities": probs.tolist()}
+        unitary = [op for op in ops if op.name != "MEASURE"]
+        states = []
+        for i in range(points):
+            point_ops = [op._replace(theta=float(op.theta[i])) if isinstance(op.theta, np.ndarray) else op
+                         for op in unitary]
+            c, qs = _cirq_circuit(n, point_ops)
+            states.append(sim.simulate(c, qubit_order=qs).final_state_vector)
+        states = np.array(states)
+    else:
+        states = statevector.sweep_states(n, ops, points)
+
+    probs = np.abs(states) ** 2
+    swept = [
+        {"type": op.name, "target": op.qubits[0], "theta": op.theta.tolist()}
+        for op in ops if isinstance(op.theta, np.ndarray)
+    ]
+    return {
+        "points": points,
+        "parameters": swept,
+        "probabilities": probs.tolist(),
+        "expectations": _qubit_z_expectations(probs, n).tolist(),
+    }
+
+
+def _unitary_final_state(n, ops, backend):
+    # Final state with MEASURE gates dropped, from either backend, in double
+    # precision so expectations and finite differences stay accurate
+    unitary = [op for op in ops if op.name != "MEASURE"]
+    if backend == "cirq":
+        c, qs = _cirq_circuit(n, unitary)
+        return cirq.Simulator(dtype=np.complex128).simulate(c, qubit_order=qs).final_state_vector
+    return _dense_state(n, passes.simplify_gates(unitary), precision="complex128")
+
+
+def simulate_expectation(data, observable, backend=DEFAULT_BACKEND):
+    """
+    Exact <psi|H|psi> of the circuit's final state for a weighted sum of Pauli
+    strings (see app.observables), with no sampling. MEASURE gates are
+    ignored, as in sweeps.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    n, ops = parse_circuit(data)
+    if n > MAX_DENSE_QUBITS:
+        raise ValueError(f"Expectation values are limited to {MAX_DENSE_QUBITS} qubits")
+    terms = observables.parse_observable(observable, n)
+    psi = _unitary_final_state(n, ops, backend).reshape((2,) * n)
+    value, values = observables.expectation(psi, terms)
+    return {
+        "expectation": value,
+        "terms": [{"pauli": p, "coeff": c, "expectation": float(v)} for (p, c), v in zip(terms, values)],
+    }
+
+
+def simulate_gradient(data, observable, method="adjoint", backend=DEFAULT_BACKEND):
+    """
+    Gradient of <psi|H|psi> with respect to every RX/RY/RZ angle, in circuit
+    order. "adjoint" gets all of them in about two simulations (numpy engine
+    only); "parameter_shift" evaluates the 2P shifted circuits, stacked on the
+    numpy engine, and is kept as a cross-check. MEASURE gates are ignored.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if method not in gradients.GRADIENT_METHODS:
+        raise ValueError(f"Unknown gradient method: {method}")
+    n, ops = parse_circuit(data)
+    if n > MAX_DENSE_QUBITS:
+        raise ValueError(f"Gradients are limited to {MAX_DENSE_QUBITS} qubits")
+    terms = observables.parse_observable(observable, n)
+    unitary = [op for op in ops if op.name != "MEASURE"]
+
+    if method == "adjoint":
+        if backend != "numpy":
+            raise ValueError("Adjoint gradients need the numpy backend")
+        value, grads = gradients.adjoint_gradient(n, unitary, terms)
+    else:
+        def energy(sv):
+            return observables.expectation(sv.reshape((2,) * n), terms)[0]
+
+        value = energy(_unitary_final_state(n, unitary, backend))
+        circuits = gradients.shifted_circuits(unitary)
+        if backend == "cirq":
+            expectations = [energy(_unitary_final_state(n, c, backend)) for c in circuits]
+        else:
+            expectations = []
+            chunk = max(1, BATCH_AMPLITUDE_BUDGET >> n)
+            for start in range(0, len(circuits), chunk):
+                expectations += [energy(sv) for sv in statevector.final_states(n, circuits[start:start + chunk])]
+        grads = gradients.parameter_shift_gradient(expectations)
+
+    rotations = [unitary[i] for i in gradients.parameter_ops(unitary)]
+    return {
+        "expectation": value,
+        "method": method,
+        "gradients": [
+            {"type": op.name, "target": op.qubits[0], "theta": op.theta, "gradient": g}
+            for op, g in zip(rotations, grads)
+        ],
+    }
+
+
+def simulate_trace(data, amplitudes=False, bloch=False, threshold=None, encoding="json", dtype="float64",
+                   top_k=None):
+    """
+    Step-through execution on the numpy engine: one pass over the circuit
+    that records the state after every step column of the editor grid. Each
+    record is sparse, keeping only outcomes above threshold and within the
+    top_k most likely (by default every nonzero one on narrow circuits, the
+    TRACE_TOP_K largest on wide ones), optionally with their amplitudes and
+    every qubit's Bloch vector. MEASURE gates are ignored, so the timeline is
+    the unitary evolution.
+    """
+    n, groups = parse_moments(data)
+    if n > MAX_DENSE_QUBITS:
+        raise ValueError(f"Traces are limited to {MAX_DENSE_QUBITS} qubits")
+    if len(groups) > MAX_TRACE_STEPS:
+        raise ValueError(f"Traces are limited to {MAX_TRACE_STEPS} steps")
+    if threshold is None and top_k is None and n > TRACE_NONZERO_QUBITS:
+        top_k = TRACE_TOP_K
+    sparse = sparse_options(threshold=threshold, top_k=top_k, nonzero=threshold is None)
+    if top_k is not None and len(groups) * min(sparse["top_k"], 2 ** n) > MAX_TRACE_ENTRIES:
+        raise ValueError(f"Traces are limited to {MAX_TRACE_ENTRIES} outcomes in total; lower top_k")
+
+    psi = statevector.zero_state(n)
+    steps = []
+    entries = 0
+    for step, ops in groups:
+        psi = statevector.apply_ops(psi, passes.fuse_for_width(n, [op for op in ops if op.name != "MEASURE"])[0])
+        sv = psi.reshape(-1)
+        record = {"step": step, "gates": [op.name for op in ops]}
+        record.update(_sparse_result(np.abs(sv) ** 2, sv if amplitudes else None, sparse, encoding, dtype)["sparse"])
+        # Only a threshold can keep more outcomes than expected, so this is the
+        # budget check for thresholded traces
+        entries += len(record["indices"])
+        if entries > MAX_TRACE_ENTRIES:
+            raise ValueError(
+                f"Traces are limited to {MAX_TRACE_ENTRIES} outcomes in total; raise threshold or set top_k"
+            )
+        if bloch:
+            record["bloch"] = statevector.bloch_vectors(sv, n).tolist()
+        steps.append(record)
+    return {"qubits": n, "steps": steps}
@@ -0,0 +1,230 @@
+import numpy as np
+
+from .circuit import defer_measurements
+
+# Stabilizer tableau engine for Clifford-only circuits (Aaronson & Gottesman,
+# "Improved simulation of stabilizer circuits"). Only the n stabilizer rows are
+# tracked: measurement statistics come from the tableau's canonical form, so
+# the destabilizer half of CHP is never needed.
+
+CLIFFORD_GATES = ("X", "Y", "Z", "H", "S", "CNOT", "CZ", "SWAP", "MEASURE")
+
+
+def is_clifford(ops):
+    return all(op.name in CLIFFORD_GATES for op in ops)
+
+
+def _rowsum(x, z, r, targets, src):
+    """Multiplies stabilizer row src into every row in targets, tracking signs."""
+    x1 = x[src].astype(np.int8)
+    z1 = z[src].astype(np.int8)
+    x2 = x[targets].astype(np.int8)
+    z2 = z[targets].astype(np.int8)
+    # Exponent of i picked up by each single-qubit Pauli product (the g function)
+    g = np.where(x1 & z1, z2 - x2,
+                 np.where(x1, z2 * (2 * x2 - 1),
+                          np.where(z1, x2 * (1 - 2 * z2), 0)))
+    total = 2 * r[targets].astype(np.int64) + 2 * int(r[src]) + g.sum(axis=1)
+    r[targets] = (total % 4) == 2
+    x[targets] ^= x[src]
+    z[targets] ^= z[src]
+
+
+class Tableau:
+    """Stabilizer generators of an n-qubit state, starting from |0...0>."""
+
+    def __init__(self, n):
+        self.n = n
+        self.x = np.zeros((n, n), dtype=bool)
+        self.z = np.eye(n, dtype=bool)
+        self.r = np.zeros(n, dtype=bool)
+
+    def h(self, a):
+        self.r ^= self.x[:, a] & self.z[:, a]
+        self.x[:, a], self.z[:, a] = self.z[:, a].copy(), self.x[:, a].copy()
+
+    def s(self, a):
+        self.r ^= self.x[:, a] & self.z[:, a]
+        self.z[:, a] ^= self.x[:, a]
+
+    def cnot(self, a, b):
+        self.r ^= self.x[:, a] & self.z[:, b] & ~(self.x[:, b] ^ self.z[:, a])
+        self.x[:, b] ^= self.x[:, a]
+        self.z[:, a] ^= self.z[:, b]
+
+    def cz(self, a, b):
+        self.h(b)
+        self.cnot(a, b)
+        self.h(b)
+
+    def swap(self, a, b):
+        for m in (self.x, self.z):
+            m[:, [a, b]] = m[:, [b, a]]
+
+    def apply(self, op):
+        t = op.name
+        q = op.qubits
+        if t == "X":
+            self.r ^= self.z[:, q[0]]
+        elif t == "Z":
+            self.r ^= self.x[:, q[0]]
+        elif t == "Y":
+            self.r ^= self.x[:, q[0]] ^ self.z[:, q[0]]
+        elif t == "H":
+            self.h(q[0])
+        elif t == "S":
+            self.s(q[0])
+        elif t == "CNOT":
+            self.cnot(*q)
+        elif t == "CZ":
+            self.cz(*q)
+        elif t == "SWAP":
+            self.swap(*q)
+        else:
+            raise ValueError(f"{t} is not a Clifford gate")
+
+    def support(self):
+        """
+        Z-basis outcomes of the state form the affine space x0 + span(basis),
+        each with probability 2^-k. Returns (x0, basis) as bool arrays.
+        """
+        x, z, r = self.x.copy(), self.z.copy(), self.r.copy()
+        n = self.n
+        # Row-reduce the X block; the pivot rows span the flipped bits
+        k = 0
+        for col in range(n):
+            rows = np.flatnonzero(x[k:, col])
+            if rows.size == 0:
+                continue
+            p = k + rows[0]
+            for m in (x, z, r):
+                m[[k, p]] = m[[p, k]]
+            others = np.flatnonzero(x[:, col])
+            others = others[others != k]
+            if others.size:
+                _rowsum(x, z, r, others, k)
+            k += 1
+        # Remaining rows are +-Z strings: each fixes the parity z.b = r
+        x0 = np.zeros(n, dtype=bool)
+        row = k
+        for col in range(n):
+            if row == n:
+                break
+            rows = np.flatnonzero(z[row:, col])
+            if rows.size == 0:
+                continue
+            p = row + rows[0]
+            for m in (x, z, r):
+                m[[row, p]] = m[[p, row]]
+            others = np.flatnonzero(z[k:, col]) + k
+            others = others[others != row]
+            if others.size:
+                _rowsum(x, z, r, others, row)
+            row += 1
+        # Reduced echelon form: set the free bits to 0 and read off the pivots
+        for i in range(k, n):
+            cols = np.flatnonzero(z[i])
+            if cols.size:
+                x0[cols[0]] = r[i]
+        return x0, x[:k].copy()
+
+
+def run(n, ops):
+    tab = Tableau(n)
+    for op in ops:
+        if op.name != "MEASURE":
+            tab.apply(op)
+    return tab
+
+
+def project(x0, basis, wires):
+    """
+    The support seen on the given wires only: (x0, basis) of the projected
+    affine space, its basis row-reduced to independent rows. A projection of
+    a uniform distribution is uniform, so this is the marginal of those wires.
+    """
+    rows = basis[:, wires].copy()
+    k = 0
+    for col in range(rows.shape[1]):
+        hits = np.flatnonzero(rows[k:, col])
+        if hits.size == 0:
+            continue
+        p = k + hits[0]
+        rows[[k, p]] = rows[[p, k]]
+        others = np.flatnonzero(rows[:, col])
+        rows[others[others != k]] ^= rows[k]
+        k += 1
+        if k == rows.shape[0]:
+            break
+    return x0[wires].copy(), rows[:k]
+
+
+def sampler(n, ops):
+    """
+    sample_bits() split into its setup and its draws: runs the tableau once
+    and returns draw(shots, rng), which gives (shots, n) bit matrices in
+    O(shots * k * n), so large runs can be drawn a chunk at a time.
+    """
+    total, unitary, readout = defer_measurements(n, ops)
+    if readout:
+        x0, basis = project(*run(total, unitary).support(), list(readout.values()))
+        # Float products are exact here (entries count at most n ones) and use BLAS
+        x0, basis = x0.astype(np.int64), basis.astype(float)
+
+    def draw(shots, rng):
+        shot_matrix = np.zeros((shots, n), dtype=int)
+        if readout:
+            coeffs = rng.integers(0, 2, size=(shots, basis.shape[0])).astype(float)
+            outcomes = (coeffs @ basis).astype(np.int64) % 2 ^ x0
+            shot_matrix[:, list(readout)] = outcomes
+        return shot_matrix
+
+    return draw
+
+
+def sample_bits(n, ops, shots, rng=None):
+    """Same contract as statevector.sample_bits, in O(shots * k * n) after setup."""
+    return sampler(n, ops)(shots, rng or np.random.default_rng())
+
+
+def qubit_probabilities(x0, basis):
+    """P(qubit reads 1): 1/2 wherever the support varies, else the fixed bit."""
+    random = basis.any(axis=0)
+    return np.where(random, 0.5, x0.astype(float)).tolist()
+
+
+def _enumerate_support(x0, basis, limit):
+    k = basis.shape[0]
+    if 2 ** k > limit:
+        return None
+    coeffs = (np.arange(2 ** k)[:, None] >> np.arange(k - 1, -1, -1)) & 1
+    return (coeffs @ basis.astype(np.int64)) % 2 ^ x0.astype(np.int64)
+
+
+def outcome_probabilities(x0, basis, limit=4096):
+    """{bitstring: probability} over the whole support, or None past limit outcomes."""
+    outcomes = _enumerate_support(x0, basis, limit)
+    if outcomes is None:
+        return None
+    p = 1.0 / len(outcomes)
+    return {"".join(map(str, row)): p for row in outcomes.tolist()}
+
+
+def readout_probabilities(x0, basis, n, readout, limit=4096):
+    """
+    Exact distribution of measurement records, keyed by n-bit strings where
+    qubit q shows the bit of wire readout[q] and unmeasured qubits read 0.
+    Returns None past limit support points.
+    """
+    outcomes = _enumerate_support(x0, basis, limit)
+    if outcomes is None:
+        return None
+    records = np.zeros((len(outcomes), n), dtype=np.int64)
+    for q, wire in readout.items():
+        records[:, q] = outcomes[:, wire]
+    p = 1.0 / len(outcomes)
+    dist = {}
+    for row in records.tolist():
+        key = "".join(map(str, row))
+        dist[key] = dist.get(key, 0.0) + p
+    return dist
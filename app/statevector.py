@@ -0,0 +1,507 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .circuit import defer_measurements
+
+# Native NumPy statevector engine for the editor's fixed gate set.
+# The state is kept as a (2,)*n tensor where axis q is LineQubit(q), so the
+# flattened vector uses the same big-endian ordering as cirq (q0 is the MSB).
+
+_SQRT1_2 = 1 / np.sqrt(2)
+
+FIXED_GATES = {
+    "X": np.array([[0, 1], [1, 0]], dtype=complex),
+    "Y": np.array([[0, -1j], [1j, 0]], dtype=complex),
+    "Z": np.array([[1, 0], [0, -1]], dtype=complex),
+    "H": np.array([[_SQRT1_2, _SQRT1_2], [_SQRT1_2, -_SQRT1_2]], dtype=complex),
+    "S": np.array([[1, 0], [0, 1j]], dtype=complex),
+    "T": np.array([[1, 0], [0, np.exp(1j * np.pi / 4)]], dtype=complex),
+    "CNOT": np.array([[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 0, 1], [0, 0, 1, 0]], dtype=complex),
+    "CZ": np.diag([1, 1, 1, -1]).astype(complex),
+    "SWAP": np.array([[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]], dtype=complex),
+}
+
+
+def rotation_matrix(name, theta):
+    # Same convention as cirq.rx/ry/rz: exp(-i * theta * P / 2)
+    c = np.cos(theta / 2)
+    s = np.sin(theta / 2)
+    if name == "RX":
+        return np.array([[c, -1j * s], [-1j * s, c]], dtype=complex)
+    if name == "RY":
+        return np.array([[c, -s], [s, c]], dtype=complex)
+    if name == "RZ":
+        return np.array([[np.exp(-0.5j * theta), 0], [0, np.exp(0.5j * theta)]], dtype=complex)
+    raise ValueError(f"Not a rotation gate: {name}")
+
+
+def rotation_matrices(name, thetas):
+    """rotation_matrix for an array of angles, stacked into (len(thetas), 2, 2)."""
+    thetas = np.asarray(thetas, dtype=float)
+    c = np.cos(thetas / 2)
+    s = np.sin(thetas / 2)
+    mats = np.zeros(thetas.shape + (2, 2), dtype=complex)
+    if name == "RX":
+        mats[..., 0, 0] = mats[..., 1, 1] = c
+        mats[..., 0, 1] = mats[..., 1, 0] = -1j * s
+    elif name == "RY":
+        mats[..., 0, 0] = mats[..., 1, 1] = c
+        mats[..., 0, 1] = -s
+        mats[..., 1, 0] = s
+    elif name == "RZ":
+        mats[..., 0, 0] = np.exp(-0.5j * thetas)
+        mats[..., 1, 1] = np.exp(0.5j * thetas)
+    else:
+        raise ValueError(f"Not a rotation gate: {name}")
+    return mats
+
+
+def gate_matrix(op):
+    if op.matrix is not None:
+        return op.matrix
+    if op.theta is not None:
+        return rotation_matrix(op.name, op.theta)
+    return FIXED_GATES[op.name]
+
+
+def zero_state(n, dtype=complex):
+    psi = np.zeros((2,) * n, dtype=dtype)
+    psi[(0,) * n] = 1
+    return psi
+
+
+def apply_matrix(psi, m, qubits):
+    """Contracts a 2^k x 2^k unitary into the tensor axes listed in qubits."""
+    k = len(qubits)
+    m = m.reshape((2,) * (2 * k))
+    psi = np.tensordot(m, psi, axes=(list(range(k, 2 * k)), list(qubits)))
+    return np.moveaxis(psi, list(range(k)), list(qubits))
+
+
+def apply_matrices(psi, mats, qubits):
+    """
+    Batched apply_matrix: psi is (B,) + (2,)*n and mats is (B, 2^k, 2^k), one
+    unitary per stacked state, all acting on the same qubits. A single
+    (2^k, 2^k) matrix is broadcast over the whole batch.
+    """
+    k = len(qubits)
+    axes = [1 + q for q in qubits]
+    moved = np.moveaxis(psi, axes, list(range(-k, 0)))
+    shape = moved.shape
+    flat = moved.reshape(shape[0], -1, 2 ** k)
+    out = np.matmul(flat, np.swapaxes(mats, -1, -2)).reshape(shape)
+    return np.moveaxis(out, list(range(-k, 0)), axes)
+
+
+def apply_op(psi, op):
+    return apply_matrix(psi, gate_matrix(op), op.qubits)
+
+
+# Gates applied without a matrix product: diagonal ones as an elementwise
+# phase multiply, permutations (possibly with phases, like Y) as in-place
+# swaps of tensor slices or an index gather
+DIAGONAL_GATES = ("Z", "S", "T", "RZ", "CZ")
+PERMUTATION_GATES = ("X", "Y", "CNOT", "SWAP")
+
+# A run of diagonal gates is folded into one phase tensor over at most this many qubits
+MAX_PHASE_QUBITS = 12
+
+# Smallest inner block (amplitudes after the target axis) worth a batched matmul
+DENSE_MIN_BLOCK = 32
+
+# Runs of gates on the last 14 axes are applied one 2^14-amplitude block
+# (256 KB, about an L2 cache) at a time instead of sweeping the whole state
+CACHE_BLOCK_QUBITS = 14
+
+# Gate sweeps over states this wide are split into independent chunks and run
+# on a persistent thread pool; NumPy releases the GIL inside each chunk
+PARALLEL_MIN_QUBITS = 18
+
+_pool = None
+_threads = 1
+_min_qubits = PARALLEL_MIN_QUBITS
+
+
+def set_threads(threads=0, min_qubits=PARALLEL_MIN_QUBITS):
+    """
+    Configures the kernel thread pool: 0 uses every core, 1 keeps all work
+    on the calling thread. States narrower than min_qubits always do.
+    """
+    global _pool, _threads, _min_qubits
+    threads = int(threads) or os.cpu_count() or 1
+    if threads != _threads:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ThreadPoolExecutor(threads, thread_name_prefix="statevector") if threads > 1 else None
+        _threads = threads
+    _min_qubits = int(min_qubits)
+
+
+def _slice(ndim, fixed):
+    # Basic-indexing view of the tensor with some axes pinned to 0 or 1
+    idx = [slice(None)] * ndim
+    for axis, value in fixed.items():
+        idx[axis] = value
+    return tuple(idx)
+
+
+def matrix_kind(m):
+    """"diagonal", "permutation" (one nonzero per row and column) or "dense"."""
+    if not np.any(m - np.diag(np.diag(m))):
+        return "diagonal"
+    nonzero = m != 0
+    if np.all(nonzero.sum(axis=0) == 1) and np.all(nonzero.sum(axis=1) == 1):
+        return "permutation"
+    return "dense"
+
+
+def gate_kind(op):
+    if op.name in DIAGONAL_GATES:
+        return "diagonal"
+    if op.name in PERMUTATION_GATES:
+        return "permutation"
+    if op.matrix is not None:
+        return matrix_kind(op.matrix)
+    return "dense"
+
+
+# Kernels are built once per pass for a given tensor rank and return a
+# function psi -> psi, so the same pass can be replayed over many chunks or
+# cache blocks without rebuilding matrices and index tuples each time.
+
+def _phase_tensor(op, axes):
+    # The gate's diagonal as a tensor over the sorted axes it will be multiplied into
+    diag = np.diag(gate_matrix(op)).reshape((2,) * len(op.qubits))
+    order = sorted(range(len(op.qubits)), key=lambda i: op.qubits[i])
+    diag = np.transpose(diag, order)
+    shape = [2 if q in op.qubits else 1 for q in axes]
+    return diag.reshape(shape)
+
+
+def _phase_kernel(ops, ndim, dtype):
+    # One elementwise multiply for a run of diagonal gates
+    axes = sorted({q for op in ops for q in op.qubits})
+    phase = np.ones((2,) * len(axes), dtype=complex)
+    for op in ops:
+        phase = phase * _phase_tensor(op, axes)
+    phase = phase.reshape([2 if q in axes else 1 for q in range(ndim)]).astype(dtype)
+
+    def apply(psi):
+        psi *= phase
+        return psi
+    return apply
+
+
+def _permutation_kernel(ops, ndim, dtype):
+    # Each output slice is its single source slice times a phase; only the
+    # slices that move are copied first, and unit phases are skipped
+    op = ops[0]
+    k = len(op.qubits)
+    m = gate_matrix(op)
+    source = np.argmax(m != 0, axis=1)
+    phases = m[np.arange(2 ** k), source].astype(dtype)
+    slices = [_slice(ndim, dict(zip(op.qubits, bits))) for bits in itertools.product((0, 1), repeat=k)]
+    moves = [(slices[i], int(j), phases[i]) for i, j in enumerate(source) if i != j]
+    scales = [(slices[i], phases[i]) for i, j in enumerate(source) if i == j and phases[i] != 1]
+    sources = {j for _, j, _ in moves}
+
+    def apply(psi):
+        saved = {j: psi[slices[j]].copy() for j in sources}
+        for dst, j, phase in moves:
+            psi[dst] = saved[j] if phase == 1 else saved[j] * phase
+        for dst, phase in scales:
+            psi[dst] *= phase
+        return psi
+    return apply
+
+
+def _dense_kernel(ops, ndim, dtype):
+    op = ops[0]
+    m = gate_matrix(op).astype(dtype)
+    if len(op.qubits) > 1:
+        return lambda psi: apply_matrix(psi, m, op.qubits)
+    # Batched 2x2 matmul over a (left, 2, right) view, which keeps the result
+    # contiguous unlike tensordot's moved axes. Narrow right blocks make that
+    # matmul slow, so near the last axis the gate is widened to kron(m, I)
+    # and applied as one (left, 2 right) GEMM instead.
+    right = 1 << (ndim - op.qubits[0] - 1)
+    if right >= DENSE_MIN_BLOCK:
+        return lambda psi: np.matmul(m, psi.reshape(-1, 2, right)).reshape(psi.shape)
+    wide = np.kron(m, np.eye(right, dtype=dtype)).T
+    return lambda psi: (psi.reshape(-1, 2 * right) @ wide).reshape(psi.shape)
+
+
+def _kernel_passes(ops):
+    """(kernel, ops) per pass, folding consecutive diagonal gates into one pass."""
+    passes = []
+    run, run_qubits = [], set()
+    for op in ops:
+        kind = gate_kind(op)
+        if kind == "diagonal" and len(run_qubits | set(op.qubits)) <= MAX_PHASE_QUBITS:
+            run.append(op)
+            run_qubits.update(op.qubits)
+            continue
+        if run:
+            passes.append((_phase_kernel, run))
+            run, run_qubits = [], set()
+        if kind == "diagonal":
+            run, run_qubits = [op], set(op.qubits)
+        elif kind == "permutation":
+            passes.append((_permutation_kernel, [op]))
+        else:
+            passes.append((_dense_kernel, [op]))
+    if run:
+        passes.append((_phase_kernel, run))
+    return passes
+
+
+def _renumber(ops, mapping):
+    return [op._replace(qubits=tuple(mapping[q] for q in op.qubits)) for op in ops]
+
+
+def _replay(steps, tensor):
+    # Runs built kernels over one chunk or block in place
+    out = tensor
+    for step in steps:
+        out = step(out)
+    if out is not tensor:
+        tensor[...] = out
+
+
+def _sweep(psi, kernel, ops):
+    """
+    One kernel pass over the whole state, or chunk by chunk on the thread
+    pool for wide states: the state is split along axes no op touches, each
+    chunk is an independent sub-tensor with the ops' qubits renumbered, and
+    results are written back in place.
+    """
+    if _pool is None or psi.ndim < _min_qubits:
+        return kernel(ops, psi.ndim, psi.dtype)(psi)
+    touched = {q for op in ops for q in op.qubits}
+    split = [q for q in range(psi.ndim) if q not in touched][:(_threads - 1).bit_length()]
+    step = kernel(_renumber(ops, {q: q - sum(s < q for s in split) for q in touched}), psi.ndim - len(split), psi.dtype)
+    chunks = [psi[_slice(psi.ndim, dict(zip(split, bits)))] for bits in itertools.product((0, 1), repeat=len(split))]
+    list(_pool.map(lambda chunk: _replay([step], chunk), chunks))
+    return psi
+
+
+def block_schedule(ops, n, block_qubits=CACHE_BLOCK_QUBITS):
+    """
+    Cache-blocking schedule: splits ops into ("block", ops) runs that only
+    touch the last block_qubits axes, which are contiguous in memory, and
+    ("global", ops) runs for everything else. A gate is pulled ahead of
+    earlier global gates when it shares no qubit with them, which lengthens
+    the block runs without changing the result.
+    """
+    low = n - block_qubits
+    schedule = []
+    while ops:
+        local, rest, wires = [], [], set()
+        for op in ops:
+            if all(q >= low for q in op.qubits) and not wires.intersection(op.qubits):
+                local.append(op)
+            else:
+                rest.append(op)
+                wires.update(op.qubits)
+        if local:
+            schedule.append(("block", local))
+        k = 0
+        while k < len(rest) and not all(q >= low for q in rest[k].qubits):
+            k += 1
+        if k:
+            schedule.append(("global", rest[:k]))
+        ops = rest[k:]
+    return schedule
+
+
+def _apply_blocks(psi, ops, block_qubits):
+    # Every op acts inside one contiguous block of the last block_qubits axes,
+    # so each block runs all the passes while it is still in cache
+    low = psi.ndim - block_qubits
+    ops = _renumber(ops, {q: q - low for op in ops for q in op.qubits})
+    psi = np.ascontiguousarray(psi)
+    steps = [kernel(group, block_qubits, psi.dtype) for kernel, group in _kernel_passes(ops)]
+    blocks = psi.reshape((-1,) + (2,) * block_qubits)
+    if _pool is not None and psi.ndim >= _min_qubits:
+        list(_pool.map(lambda block: _replay(steps, block), blocks))
+    else:
+        for block in blocks:
+            _replay(steps, block)
+    return psi
+
+
+def apply_ops(psi, ops):
+    """
+    Applies unitary ops to psi in place where it can and returns the result
+    (a new array after any dense gate). Diagonal gates become phase
+    multiplies, with consecutive ones folded into a single pass, and
+    permutations become slice swaps; everything else is a matrix product.
+    States wider than a cache block follow block_schedule: runs of gates on
+    the trailing axes are applied block by block, and the remaining passes
+    sweep the whole state, on the thread pool when it is wide enough. psi
+    must be writeable and not shared with the caller.
+    """
+    if psi.ndim <= CACHE_BLOCK_QUBITS:
+        schedule = [("global", ops)]
+    else:
+        schedule = block_schedule(ops, psi.ndim, CACHE_BLOCK_QUBITS)
+    for kind, segment in schedule:
+        if kind == "block" and len(segment) > 1:
+            psi = _apply_blocks(psi, segment, CACHE_BLOCK_QUBITS)
+        else:
+            for kernel, group in _kernel_passes(segment):
+                psi = _sweep(psi, kernel, group)
+    return psi
+
+
+def measure(psi, q, rng):
+    """Projective Z measurement of axis q; returns (outcome, collapsed state)."""
+    p1 = float(np.sum(np.abs(np.take(psi, 1, axis=q)) ** 2))
+    bit = int(rng.random() < p1)
+    psi = psi.copy()
+    idx = [slice(None)] * psi.ndim
+    idx[q] = 1 - bit
+    psi[tuple(idx)] = 0
+    psi *= 1 / np.sqrt(p1 if bit else 1 - p1)
+    return bit, psi
+
+
+def run(n, ops, rng=None, dtype=complex):
+    """
+    Applies every op to |0...0> and returns (state tensor, measurement bits).
+    MEASURE collapses the state like cirq.Simulator.simulate does. dtype is
+    the amplitude precision, complex (complex128) or np.complex64.
+    """
+    psi = zero_state(n, dtype)
+    bits = {}
+    segment = []
+    for op in ops:
+        if op.name == "MEASURE":
+            psi = apply_ops(psi, segment)
+            segment = []
+            if rng is None:
+                rng = np.random.default_rng()
+            bits[op.qubits[0]], psi = measure(psi, op.qubits[0], rng)
+        else:
+            segment.append(op)
+    return apply_ops(psi, segment), bits
+
+
+def final_state(n, ops, dtype=complex):
+    """Final state vector of the unitary part of the circuit (MEASURE ignored)."""
+    psi, _ = run(n, [op for op in ops if op.name != "MEASURE"], dtype=dtype)
+    return psi.reshape(-1)
+
+
+def final_states(n, circuits, dtype=complex):
+    """
+    Final state vectors of several n-qubit circuits, evolved together as one
+    (B, 2^n) array of the given dtype. At each gate position the circuits are
+    grouped by the wires they touch and every group is advanced with a single
+    batched matmul.
+    """
+    circuits = [[op for op in ops if op.name != "MEASURE"] for ops in circuits]
+    batch = len(circuits)
+    psi = np.zeros((batch,) + (2,) * n, dtype=dtype)
+    psi[(slice(None),) + (0,) * n] = 1
+    depth = max((len(ops) for ops in circuits), default=0)
+    for t in range(depth):
+        groups = {}
+        for b, ops in enumerate(circuits):
+            if t < len(ops):
+                groups.setdefault(ops[t].qubits, []).append(b)
+        for qubits, idx in groups.items():
+            mats = np.stack([gate_matrix(circuits[b][t]) for b in idx]).astype(dtype, copy=False)
+            if len(idx) == batch:
+                psi = apply_matrices(psi, mats, qubits)
+            else:
+                psi[idx] = apply_matrices(psi[idx], mats, qubits)
+    return psi.reshape(batch, -1)
+
+
+def sweep_states(n, ops, points):
+    """
+    Final states for every point of a parameter sweep as one (points, 2^n)
+    array: swept rotations apply a stack of matrices, all other gates are
+    broadcast over the sweep axis.
+    """
+    psi = np.zeros((points,) + (2,) * n, dtype=complex)
+    psi[(slice(None),) + (0,) * n] = 1
+    for op in ops:
+        if op.name == "MEASURE":
+            continue
+        if isinstance(op.theta, np.ndarray):
+            mats = rotation_matrices(op.name, op.theta)
+        else:
+            mats = gate_matrix(op)
+        psi = apply_matrices(psi, mats, op.qubits)
+    return psi.reshape(points, -1)
+
+
+def reduced_density_matrices(sv, n):
+    """(n, 2, 2) single-qubit reduced density matrices of a flat statevector."""
+    rhos = np.empty((n, 2, 2), dtype=complex)
+    for q in range(n):
+        t = sv.reshape(1 << q, 2, -1)
+        rhos[q] = np.einsum("iaj,ibj->ab", t, t.conj())
+    return rhos
+
+
+def bloch_vectors(sv, n):
+    """(n, 3) array of <X>, <Y>, <Z> for every qubit."""
+    rhos = reduced_density_matrices(sv, n)
+    off = rhos[:, 0, 1]
+    return np.stack([2 * off.real, -2 * off.imag, (rhos[:, 0, 0] - rhos[:, 1, 1]).real], axis=1)
+
+
+def marginals(probs, n):
+    """(n, 2) array of P(q=0), P(q=1) for every qubit."""
+    return np.stack([probs.reshape(1 << q, 2, -1).sum(axis=(0, 2)) for q in range(n)])
+
+
+def pair_marginals(probs, n):
+    """{(i, j): [P00, P01, P10, P11]} for every pair of qubits i < j."""
+    out = {}
+    for i in range(n - 1):
+        # Sum out the qubits before i once, then split the rest per j
+        head = probs.reshape(1 << i, 2, -1).sum(axis=0)
+        for j in range(i + 1, n):
+            t = head.reshape(2, 1 << (j - i - 1), 2, -1)
+            out[(i, j)] = t.sum(axis=(1, 3)).reshape(4)
+    return out
+
+
+def sample_indices(probs, shots, rng):
+    """Draws shots basis-state indices with one searchsorted over the cumulative distribution."""
+    cdf = np.cumsum(probs, dtype=float)
+    idx = np.searchsorted(cdf, rng.random(shots) * cdf[-1], side="right")
+    return np.minimum(idx, probs.size - 1)
+
+
+def sample_bits(n, ops, shots, rng=None, max_width=None, dtype=complex):
+    """
+    Returns a (shots, n) int matrix of measured bits; unmeasured qubits stay 0.
+    The circuit is simulated once, with mid-circuit measurements deferred onto
+    ancilla wires, and every shot is drawn from that final distribution. Only
+    when the ancillas would push the width past max_width does it fall back
+    to one collapsing trajectory per shot.
+    """
+    rng = rng or np.random.default_rng()
+    shot_matrix = np.zeros((shots, n), dtype=int)
+    total, unitary, readout = defer_measurements(n, ops)
+    if not readout:
+        return shot_matrix
+    if total == n or max_width is None or total <= max_width:
+        probs = np.abs(final_state(total, unitary, dtype)) ** 2
+        idx = sample_indices(probs, shots, rng)
+        for q, wire in readout.items():
+            shot_matrix[:, q] = (idx >> (total - 1 - wire)) & 1
+        return shot_matrix
+    for s in range(shots):
+        _, bits = run(n, ops, rng, dtype)
+        for q, b in bits.items():
+            shot_matrix[s, q] = b
+    return shot_matrix
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class SharedResultStore:
+    """
+    On-disk store of serialized simulation responses, shared by every worker
+    process on the host. Backed by SQLite in WAL mode so Passenger workers can
+    read concurrently; entries expire after ttl seconds and the least recently
+    used ones are dropped once the table grows past max_bytes. Any database
+    error is treated as a miss so a locked or broken file never fails a request.
+    """
+
+    def __init__(self, path, ttl=24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _conn(self):
+        # One connection per thread, reopened after a fork so workers never share one
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT body FROM results WHERE key = ? AND created > ?", (key, now - self.ttl)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return bytes(row[0])
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+
+    def put(self, key, body):
+        size = len(body)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, body, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(body), size, now, now),
+            )
+            self._evict(conn, now)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM results WHERE created <= ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+            doomed.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+
+    def clear(self):
+        try:
+            self._conn().execute("DELETE FROM results")
+        except sqlite3.Error:
+            self.errors += 1
+
+    def stats(self):
+        try:
+            entries, size = self._conn().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
@@ -0,0 +1,290 @@
+import numpy as np
+
+from . import gradients, observables
+from .circuit import Op
+
+# Server-side variational loops (QAOA / VQE): the circuit is compiled once per
+# request and the optimizer runs in-process, yielding one record per iteration.
+
+ANSATZE = ("qaoa", "hardware_efficient")
+OPTIMIZERS = ("adam", "gd", "spsa")
+DEFAULT_LEARNING_RATES = {"adam": 0.05, "gd": 0.1, "spsa": 0.2}
+
+MAX_OPT_QUBITS = 16
+MAX_LAYERS = 16
+MAX_ITERATIONS = 1000
+
+
+def maxcut_observable(edges, n):
+    """
+    Terms of H = sum_w w/2 (Z_i Z_j - 1) over edges [i, j] or [i, j, w], so
+    the energy is minus the expected (weighted) cut.
+    """
+    terms = []
+    for edge in edges:
+        if not isinstance(edge, (list, tuple)) or len(edge) not in (2, 3):
+            raise ValueError(f"Edge must be [i, j] or [i, j, weight], got {edge!r}")
+        i, j = int(edge[0]), int(edge[1])
+        w = float(edge[2]) if len(edge) == 3 else 1.0
+        if i == j or not (0 <= i < n and 0 <= j < n):
+            raise ValueError(f"Invalid edge {edge!r} for {n} nodes")
+        pauli = ["I"] * n
+        pauli[i] = pauli[j] = "Z"
+        terms.append(("".join(pauli), w / 2))
+        terms.append(("I" * n, -w / 2))
+    if not terms:
+        raise ValueError("MaxCut needs at least one edge")
+    return terms
+
+
+def parse_problem(problem):
+    """(n, terms) from {"type": "maxcut", "edges": ...} or {"type": "hamiltonian", "observable": ...}."""
+    if not isinstance(problem, dict):
+        raise ValueError("problem must be an object")
+    kind = problem.get("type", "maxcut")
+    if kind == "maxcut":
+        edges = problem.get("edges") or []
+        nodes = [int(v) for e in edges if isinstance(e, (list, tuple)) for v in e[:2]]
+        n = int(problem.get("qubits") or (max(nodes) + 1 if nodes else 0))
+    elif kind == "hamiltonian":
+        n = int(problem.get("qubits", 0))
+    else:
+        raise ValueError(f"Unknown problem type: {kind}")
+    if not 1 <= n <= MAX_OPT_QUBITS:
+        raise ValueError(f"Optimization problems need between 1 and {MAX_OPT_QUBITS} qubits")
+    if kind == "maxcut":
+        return n, maxcut_observable(problem.get("edges") or [], n)
+    return n, observables.parse_observable(problem.get("observable"), n)
+
+
+class QAOAProgram:
+    """
+    p-layer QAOA for a diagonal cost observable, compiled once per request:
+    the cost layer is an elementwise phase over the precomputed eigenvalues,
+    the mixer updates amplitude pairs in place, and every evaluation reuses
+    the same state buffers starting from a cached |+>^n. Parameters are
+    [gamma_1..gamma_p, beta_1..beta_p].
+    """
+
+    def __init__(self, n, terms, p):
+        if not observables.is_diagonal(terms):
+            raise ValueError("QAOA needs a cost observable made of I/Z terms only")
+        self.n = n
+        self.p = p
+        self.terms = terms
+        self.num_params = 2 * p
+        self.diag = observables.diagonal(terms, n).reshape(-1)
+        size = 1 << n
+        self._plus = np.full(size, 2 ** (-n / 2), dtype=complex)
+        self._psi = np.empty(size, dtype=complex)
+        self._lam = np.empty(size, dtype=complex)
+        self._work = np.empty(size, dtype=complex)
+        self._t1 = np.empty(size // 2, dtype=complex)
+        self._t2 = np.empty(size // 2, dtype=complex)
+
+    def initial_params(self, rng):
+        return rng.uniform(0, 0.5, self.num_params)
+
+    def optimum(self):
+        return float(self.diag.min())
+
+    def _phase(self, psi, gamma):
+        # psi *= exp(-i gamma D)
+        np.multiply(self.diag, -1j * gamma, out=self._work)
+        np.exp(self._work, out=self._work)
+        psi *= self._work
+
+    def _mix(self, psi, beta):
+        # RX(2 beta) on every qubit, updating (a, b) amplitude pairs in place
+        c, s = np.cos(beta), -1j * np.sin(beta)
+        for q in range(self.n):
+            v = psi.reshape(1 << q, 2, -1)
+            a, b = v[:, 0], v[:, 1]
+            t1 = self._t1.reshape(1 << q, -1)
+            t2 = self._t2.reshape(1 << q, -1)
+            np.multiply(b, s, out=t1)
+            np.multiply(a, s, out=t2)
+            a *= c
+            a += t1
+            b *= c
+            b += t2
+
+    def _sum_x(self, psi):
+        # (sum_q X_q) psi into the work buffer
+        out = self._work
+        out[:] = 0
+        for q in range(self.n):
+            v = psi.reshape(1 << q, 2, -1)
+            o = out.reshape(1 << q, 2, -1)
+            o[:, 0] += v[:, 1]
+            o[:, 1] += v[:, 0]
+        return out
+
+    def _forward(self, params):
+        psi = self._psi
+        psi[:] = self._plus
+        for gamma, beta in zip(params[:self.p], params[self.p:]):
+            self._phase(psi, gamma)
+            self._mix(psi, beta)
+        return psi
+
+    def energy(self, params):
+        psi = self._forward(params)
+        return float(self.diag @ (psi.real ** 2 + psi.imag ** 2))
+
+    def energy_and_gradient(self, params):
+        """Energy and its gradient by the adjoint method over the compiled layers."""
+        gammas, betas = params[:self.p], params[self.p:]
+        psi = self._forward(params)
+        lam = self._lam
+        np.multiply(psi, self.diag, out=lam)
+        energy = float(np.vdot(psi, lam).real)
+        grad = np.empty(self.num_params)
+        for layer in range(self.p - 1, -1, -1):
+            # d/dbeta exp(-i beta B) = -i B U, and Re(-i z) = Im(z)
+            grad[self.p + layer] = 2 * np.vdot(lam, self._sum_x(psi)).imag
+            self._mix(psi, -betas[layer])
+            self._mix(lam, -betas[layer])
+            grad[layer] = 2 * np.vdot(lam, np.multiply(psi, self.diag, out=self._work)).imag
+            self._phase(psi, -gammas[layer])
+            self._phase(lam, -gammas[layer])
+        return energy, grad
+
+    def circuit(self, params):
+        """The bound ansatz in the editor's circuit JSON."""
+        gates = [{"type": "H", "target": q} for q in range(self.n)]
+        for gamma, beta in zip(params[:self.p], params[self.p:]):
+            for pauli, coeff in self.terms:
+                support = [q for q, c in enumerate(pauli) if c == "Z"]
+                if not support:
+                    continue
+                # exp(-i gamma c Z..Z) as a CNOT parity ladder around one RZ
+                ladder = [{"type": "CNOT", "control": a, "target": b} for a, b in zip(support, support[1:])]
+                gates += ladder
+                gates.append({"type": "RZ", "target": support[-1], "params": {"theta": 2 * gamma * coeff}})
+                gates += ladder[::-1]
+            gates += [{"type": "RX", "target": q, "params": {"theta": 2 * beta}} for q in range(self.n)]
+        return {"qubits": self.n, "gates": gates}
+
+
+class HardwareEfficientProgram:
+    """
+    VQE ansatz for any Pauli observable: p+1 layers of RY on every qubit with
+    a CNOT chain between them, differentiated with the adjoint method.
+    """
+
+    def __init__(self, n, terms, p):
+        self.n = n
+        self.p = p
+        self.terms = terms
+        self.num_params = n * (p + 1)
+        self.template = []
+        for layer in range(p + 1):
+            self.template += [Op("RY", (q,), 0.0) for q in range(n)]
+            if layer < p:
+                self.template += [Op("CNOT", (q, q + 1), None) for q in range(n - 1)]
+        self._slots = gradients.parameter_ops(self.template)
+
+    def initial_params(self, rng):
+        return rng.uniform(-0.1, 0.1, self.num_params)
+
+    def optimum(self):
+        return None
+
+    def bind(self, params):
+        ops = list(self.template)
+        for i, theta in zip(self._slots, params):
+            ops[i] = ops[i]._replace(theta=float(theta))
+        return ops
+
+    def energy_and_gradient(self, params):
+        energy, grads = gradients.adjoint_gradient(self.n, self.bind(params), self.terms)
+        return energy, np.array(grads)
+
+    def energy(self, params):
+        return self.energy_and_gradient(params)[0]
+
+    def circuit(self, params):
+        gates = []
+        for op in self.bind(params):
+            if op.name == "RY":
+                gates.append({"type": "RY", "target": op.qubits[0], "params": {"theta": op.theta}})
+            else:
+                gates.append({"type": "CNOT", "control": op.qubits[0], "target": op.qubits[1]})
+        return {"qubits": self.n, "gates": gates}
+
+
+def compile_program(problem, ansatz=None, p=1):
+    n, terms = parse_problem(problem)
+    p = int(p)
+    if not 1 <= p <= MAX_LAYERS:
+        raise ValueError(f"p must be between 1 and {MAX_LAYERS}")
+    if ansatz is None:
+        ansatz = "qaoa" if observables.is_diagonal(terms) else "hardware_efficient"
+    if ansatz == "qaoa":
+        return QAOAProgram(n, terms, p)
+    if ansatz == "hardware_efficient":
+        return HardwareEfficientProgram(n, terms, p)
+    raise ValueError(f"Unknown ansatz: {ansatz}")
+
+
+def optimize(program, optimizer="adam", iterations=100, learning_rate=None, seed=None, params=None):
+    """
+    Validates the optimizer settings and returns a generator that runs the
+    loop, yielding {"iteration", "energy", "params"} per step and a final
+    {"done": True, ...} record with the best parameters and bound circuit.
+    """
+    if optimizer not in OPTIMIZERS:
+        raise ValueError(f"Unknown optimizer: {optimizer}")
+    iterations = int(iterations)
+    if not 1 <= iterations <= MAX_ITERATIONS:
+        raise ValueError(f"iterations must be between 1 and {MAX_ITERATIONS}")
+    lr = float(learning_rate) if learning_rate is not None else DEFAULT_LEARNING_RATES[optimizer]
+    rng = np.random.default_rng(seed)
+    if params is None:
+        theta = program.initial_params(rng)
+    else:
+        theta = np.array(params, dtype=float)
+        if theta.shape != (program.num_params,):
+            raise ValueError(f"Expected {program.num_params} initial parameters")
+    return _iterate(program, optimizer, iterations, lr, rng, theta)
+
+
+def _iterate(program, optimizer, iterations, lr, rng, theta):
+    m = np.zeros_like(theta)
+    v = np.zeros_like(theta)
+    best_energy, best_params = np.inf, theta
+    for k in range(iterations):
+        if optimizer == "spsa":
+            # Two evaluations per step along a random +/-1 direction, standard gain schedules
+            delta = rng.choice((-1.0, 1.0), size=theta.size)
+            ck = 0.1 / (k + 1) ** 0.101
+            grad = (program.energy(theta + ck * delta) - program.energy(theta - ck * delta)) / (2 * ck) * delta
+            energy = program.energy(theta)
+            step = lr / (k + 1) ** 0.602 * grad
+        else:
+            energy, grad = program.energy_and_gradient(theta)
+            if optimizer == "adam":
+                m = 0.9 * m + 0.1 * grad
+                v = 0.999 * v + 0.001 * grad ** 2
+                step = lr * (m / (1 - 0.9 ** (k + 1))) / (np.sqrt(v / (1 - 0.999 ** (k + 1))) + 1e-8)
+            else:
+                step = lr * grad
+        if energy < best_energy:
+            best_energy, best_params = energy, theta
+        yield {"iteration": k, "energy": energy, "params": theta.tolist()}
+        theta = theta - step
+
+    energy = program.energy(theta)
+    if energy < best_energy:
+        best_energy, best_params = energy, theta
+    yield {
+        "done": True,
+        "iterations": iterations,
+        "energy": energy,
+        "params": theta.tolist(),
+        "best_energy": best_energy,
+        "best_params": best_params.tolist(),
+        "optimum": program.optimum(),
+        "circuit": program.circuit(best_params),
+    }
@@ -226,6 +226,11 @@ function updateQubitCount() {
     document.getElementById('qubit-count').textContent = state.qubits;
 }
 
+// True when qubit is g's control or, for a SWAP, its second wire
+function isSecondaryWire(g, qubit) {
+    return g.control === qubit || (g.type === 'SWAP' && g.params && g.params.other === qubit);
+}
+
 function handleDrop(e, qubit, step) {
     if (e) e.preventDefault();
     const type = state.draggedType;
@@ -238,10 +243,10 @@ function handleDrop(e, qubit, step) {
         state.gates = state.gates.filter(g => g !== existing);
     }
 
-    // Also check if this slot is a control for another gate
-    const existingControl = state.gates.find(g => g.control === qubit && g.step === step);
+    // Also check if this slot is a control or swap partner for another gate
+    const existingControl = state.gates.find(g => g.step === step && isSecondaryWire(g, qubit));
     if (existingControl) {
-        alert("Cannot place gate here: This qubit is a control for another gate at this step.");
+        alert("Cannot place gate here: This qubit is already used by another gate at this step.");
         return;
     }
 
@@ -284,6 +289,14 @@ function handleZoneClick(qubit, step) {
         // Finalize Operation
         const op = state.pendingOp;
         const gate = state.gates.find(g => g.target === op.target && g.step === op.step && g.type === op.type);
+
+        // A gate may not share a qubit with any other gate in its step
+        const occupied = state.gates.some(g => g !== gate && g.step === step &&
+            (g.target === qubit || isSecondaryWire(g, qubit)));
+        if (occupied) {
+            alert("Cannot use this qubit: it is already used by another gate at this step.");
+            return;
+        }
         
         if (gate) {
             if (op.type === 'CNOT' || op.type === 'CZ') {
@@ -306,10 +319,7 @@ function handleZoneClick(qubit, step) {
     }
 
     // Check if it's a control point or swap partner
-    const controlGateIndex = state.gates.findIndex(g => 
-        (g.control === qubit && g.step === step) || 
-        (g.type === 'SWAP' && g.params && g.params.other === qubit && g.step === step)
-    );
+    const controlGateIndex = state.gates.findIndex(g => g.step === step && isSecondaryWire(g, qubit));
     if (controlGateIndex !== -1) {
         state.gates.splice(controlGateIndex, 1);
         render();
@@ -583,7 +593,9 @@ async function callBackend() {
                 qubits: state.qubits,
                 gates: sortedGates
             },
-            shots: 0 // 0 for statevector/probabilities
+            shots: 0, // 0 for statevector/probabilities
+            format: 'base64', // packed little-endian floats instead of str(complex) lists
+            reduced: true // per-qubit Bloch vectors computed server-side
         };
 
         const res = await fetch('/api/simulate', {
@@ -592,7 +604,7 @@ async function callBackend() {
             body: JSON.stringify(payload)
         });
 
-        const data = await res.json();
+        const data = decodeResult(await res.json());
 
         if (data.error) {
             output.textContent = `Error: ${data.error}`;
@@ -621,8 +633,8 @@ async function callBackend() {
                 }
 
                 // Render Bloch Spheres
-                if (data.statevector) {
-                    renderBlochSpheres(data.statevector, state.qubits);
+                if (data.bloch || data.statevector) {
+                    renderBlochSpheres(data.statevector, state.qubits, data.bloch);
                 }
                 
                 // Validate Task
@@ -713,6 +725,36 @@ function renderChart(labels, data) {
     });
 }
 
+// --- Binary result decoding ---
+
+function decodeBase64Floats(field) {
+    // field: { encoding: 'base64', dtype: 'float32' | 'float64', shape, data }
+    const bin = atob(field.data);
+    const bytes = new Uint8Array(bin.length);
+    for (let i = 0; i < bin.length; i++) {
+        bytes[i] = bin.charCodeAt(i);
+    }
+    // The server packs little-endian floats, which is every browser's native order
+    return field.dtype === 'float32' ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+}
+
+function decodeResult(data) {
+    // Turn base64-packed arrays back into what the rest of the editor expects:
+    // probabilities as an indexable array and amplitudes as {re, im} pairs
+    if (data && data.probabilities && data.probabilities.encoding === 'base64') {
+        data.probabilities = decodeBase64Floats(data.probabilities);
+    }
+    if (data && data.statevector && data.statevector.encoding === 'base64') {
+        const flat = decodeBase64Floats(data.statevector);
+        const amps = new Array(flat.length / 2);
+        for (let i = 0; i < amps.length; i++) {
+            amps[i] = { re: flat[2 * i], im: flat[2 * i + 1] };
+        }
+        data.statevector = amps;
+    }
+    return data;
+}
+
 // --- Bloch Sphere Logic ---
 
 function parseComplex(str) {
@@ -796,6 +838,9 @@ function parseComplex(str) {
 }
 
 function parseComplexPython(str) {
+    // Already decoded from the binary format
+    if (typeof str === 'object') return str;
+
     // str is like "(0.7071067811865476+0j)"
     str = str.replace(/[()]/g, '');
 
@@ -897,12 +942,15 @@ function getBlochVector(qubit, nQubits, statevector) {
     return { x, y, z };
 }
 
-function renderBlochSpheres(statevector, nQubits) {
+function renderBlochSpheres(statevector, nQubits, bloch) {
     const container = document.getElementById('bloch-container');
     container.innerHTML = '';
 
     for (let q = 0; q < nQubits; q++) {
-        const vec = getBlochVector(q, nQubits, statevector);
+        // Prefer the server's per-qubit vectors; fall back to the full statevector
+        const vec = bloch
+            ? { x: bloch[q][0], y: bloch[q][1], z: bloch[q][2] }
+            : getBlochVector(q, nQubits, statevector);
         
         const wrapper = document.createElement('div');
         wrapper.className = 'bloch-wrapper';
@@ -1073,6 +1121,13 @@ init();
 
 // --- Task Validation & Progress ---
 
+// Exact results (a statevector, or Born-rule probabilities) only need floating
+// point slack; sampled ones get about four standard errors of a 50/50 estimate
+function probabilityTolerance(data) {
+    if (data.statevector || !data.sampled_shots) return 0.01;
+    return Math.max(0.01, 2 / Math.sqrt(data.sampled_shots));
+}
+
 function validateTask(data) {
     if (!window.currentTask) return;
     
@@ -1093,12 +1148,12 @@ function validateTask(data) {
             console.log(`Validation: p0=${p0}, p1=${p1}, hasH=${hasH}, hasMeasure=${hasMeasure}`);
 
             if (hasH && hasMeasure) {
-                 // Allow 15% tolerance to be safe (approx 0.35-0.65)
-                 if (Math.abs(p0 - 0.5) < 0.15 && Math.abs(p1 - 0.5) < 0.15) {
+                 const tol = probabilityTolerance(data);
+                 if (Math.abs(p0 - 0.5) < tol && Math.abs(p1 - 0.5) < tol) {
                      success = true;
                      message = "Correct! You prepared |+> and measured it. The probabilities reflect the Born rule (50/50).";
                  } else {
-                     message = `You have the gates, but probabilities (${(p0*100).toFixed(1)}% / ${(p1*100).toFixed(1)}%) are not close enough to 50/50. Try running again.`;
+                     message = `You have the gates, but probabilities (${(p0*100).toFixed(1)}% / ${(p1*100).toFixed(1)}%) are not 50/50. Check for extra gates.`;
                  }
              } else if (!hasH) {
                  message = "First, create a superposition using the H gate.";
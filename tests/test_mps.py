@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import statevector
+from app.circuit import Op, parse_circuit
+from app.mps import MPS
+from app.simulate import simulate
+from test_simulation import random_circuit
+
+
+def ghz(n):
+    gates = [{"type": "H", "target": 0}]
+    gates += [{"type": "CNOT", "control": q, "target": q + 1} for q in range(n - 1)]
+    return {"qubits": n, "gates": gates}
+
+
+class TestMPS(unittest.TestCase):
+    def test_matches_dense_engine(self):
+        rng = np.random.default_rng(41)
+        for _ in range(20):
+            n, ops = parse_circuit(random_circuit(rng, int(rng.integers(2, 7)), 50))
+            state = MPS(n)
+            state.apply_ops(ops)
+            expected = statevector.final_state(n, ops)
+            np.testing.assert_allclose(state.statevector(), expected, atol=1e-10)
+            bits = [int(b) for b in rng.integers(0, 2, n)]
+            self.assertAlmostEqual(state.amplitude(bits), expected[int("".join(map(str, bits)), 2)])
+            self.assertLess(state.truncation_error, 1e-12)
+
+    def test_truncation_is_reported(self):
+        rng = np.random.default_rng(43)
+        n, ops = parse_circuit(random_circuit(rng, 6, 80))
+        state = MPS(n, max_bond=2)
+        state.apply_ops(ops)
+        self.assertTrue(all(d <= 2 for d in state.bond_dims()))
+        self.assertGreater(state.truncation_error, 0)
+        # The fidelity estimate roughly tracks the true overlap with the exact state
+        overlap = abs(np.vdot(state.statevector(), statevector.final_state(n, ops))) ** 2
+        self.assertLess(overlap, 1)
+        self.assertAlmostEqual(state.fidelity, overlap, delta=0.1)
+        self.assertAlmostEqual(np.linalg.norm(state.statevector()), 1.0)
+
+    def test_swap_routing(self):
+        state = MPS(5)
+        state.apply_ops([Op("H", (4,), None), Op("CNOT", (4, 0), None)])
+        self.assertEqual(state.swaps, 6)
+        expected = np.zeros(32)
+        expected[[0b00000, 0b10001]] = 1 / np.sqrt(2)
+        np.testing.assert_allclose(state.statevector(), expected, atol=1e-12)
+
+    def test_sampling(self):
+        rng = np.random.default_rng(47)
+        n, ops = parse_circuit(random_circuit(rng, 4, 30))
+        state = MPS(n)
+        state.apply_ops(ops)
+        bits = state.sample(20000, rng)
+        idx = bits @ (2 ** np.arange(n - 1, -1, -1))
+        probs = np.abs(statevector.final_state(n, ops)) ** 2
+        np.testing.assert_allclose(np.bincount(idx, minlength=2 ** n) / 20000, probs, atol=0.02)
+
+    def test_wide_circuits(self):
+        n = 80
+        queries = ["0" * n, "1" * n, "01" * (n // 2)]
+        # Wide states default to complex64, like the dense engine
+        res = simulate(ghz(n), backend="mps", bitstrings=queries)
+        self.assertEqual(res["mps"]["bond_dims"], [2] * (n - 1))
+        self.assertEqual(res["mps"]["truncation_error"], 0.0)
+        self.assertAlmostEqual(res["amplitude_probabilities"]["0" * n], 0.5, delta=1e-6)
+        self.assertAlmostEqual(res["amplitude_probabilities"]["1" * n], 0.5, delta=1e-6)
+        self.assertAlmostEqual(res["amplitude_probabilities"]["01" * (n // 2)], 0.0)
+        exact = simulate(ghz(n), backend="mps", bitstrings=queries, precision="complex128")
+        self.assertAlmostEqual(exact["amplitude_probabilities"]["0" * n], 0.5, places=12)
+
+        circuit = ghz(n)
+        circuit["gates"] += [{"type": "MEASURE", "target": q} for q in (0, n - 1)]
+        counts = simulate(circuit, shots=100, backend="mps")["counts"]
+        self.assertEqual(set(counts), {"0" * n, "1" + "0" * (n - 2) + "1"})
+        with self.assertRaises(ValueError):
+            simulate(ghz(4), backend="mps", bitstrings=["012"])
+
+    def test_small_circuits_match_numpy_backend(self):
+        circuit = random_circuit(np.random.default_rng(53), 5, 30)
+        res = simulate(circuit, backend="mps")
+        np.testing.assert_allclose(res["probabilities"], simulate(circuit)["probabilities"], atol=1e-10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cirq
+
+from app import create_app
+from app.observables import commuting_groups, parse_observable
+from app.simulate import simulate, simulate_expectation, simulate_gradient
+from test_simulation import random_circuit
+
+
+def cirq_expectation(sv, n, terms):
+    qs = cirq.LineQubit.range(n)
+    paulis = {"X": cirq.X, "Y": cirq.Y, "Z": cirq.Z}
+    total = 0
+    for pauli, coeff in terms:
+        ps = cirq.PauliString({qs[q]: paulis[c] for q, c in enumerate(pauli) if c != "I"}, coefficient=coeff)
+        total += ps.expectation_from_state_vector(sv.astype(np.complex64), {q: i for i, q in enumerate(qs)}).real
+    return total
+
+
+class TestObservables(unittest.TestCase):
+    def test_parse_forms(self):
+        expected = [("ZZI", 0.5), ("XIY", -1.0)]
+        self.assertEqual(parse_observable({"ZZ": 0.5, "XIY": -1}, 3), expected)
+        self.assertEqual(parse_observable([["zz", 0.5], {"pauli": "XIY", "coeff": -1}], 3), expected)
+        for bad in ({"ZZZZ": 1}, {"ZA": 1}, {}, "ZZ"):
+            with self.assertRaises(ValueError):
+                parse_observable(bad, 3)
+
+    def test_qubit_wise_commuting_groups(self):
+        terms = parse_observable({"ZZI": 1, "IZZ": 1, "XIX": 1, "XII": 1, "YII": 1}, 3)
+        self.assertEqual(commuting_groups(terms), [("ZZZ", [0, 1]), ("XIX", [2, 3]), ("YII", [4])])
+
+    def test_matches_cirq_pauli_sums(self):
+        rng = np.random.default_rng(5)
+        for _ in range(20):
+            n = int(rng.integers(2, 6))
+            circuit = random_circuit(rng, n, 25)
+            spec = {"".join(rng.choice(list("IXYZ"), size=n)): float(rng.normal()) for _ in range(6)}
+            res = simulate_expectation(circuit, spec)
+            sv = np.array([complex(a) for a in simulate(circuit)["statevector"]])
+            terms = parse_observable(spec, n)
+            self.assertAlmostEqual(res["expectation"], cirq_expectation(sv, n, terms), places=5)
+            ref = simulate_expectation(circuit, spec, backend="cirq")
+            self.assertAlmostEqual(res["expectation"], ref["expectation"], places=5)
+
+    def test_bell_state_correlators(self):
+        bell = {"qubits": 2, "gates": [{"type": "H", "target": 0}, {"type": "CNOT", "control": 0, "target": 1}]}
+        res = simulate_expectation(bell, {"ZZ": 1, "XX": 1, "YY": 1, "ZI": 1})
+        np.testing.assert_allclose([t["expectation"] for t in res["terms"]], [1, 1, -1, 0], atol=1e-12)
+        self.assertAlmostEqual(res["expectation"], 1.0, places=12)
+
+    def test_api_expectation_mode(self):
+        app = create_app()
+        app.config["SIM_STORE_PATH"] = ""
+        client = app.test_client()
+        circuit = {"qubits": 1, "gates": [{"type": "RY", "target": 0, "params": {"theta": np.pi / 3}}]}
+        res = client.post('/api/simulate', json={"circuit": circuit, "mode": "expectation",
+                                                 "observable": {"Z": 2.0, "X": 1.0}})
+        self.assertEqual(res.status_code, 200)
+        self.assertAlmostEqual(res.json["expectation"], 2 * np.cos(np.pi / 3) + np.sin(np.pi / 3), places=12)
+        res = client.post('/api/simulate', json={"circuit": circuit, "mode": "expectation"})
+        self.assertEqual(res.status_code, 400)
+
+
+class TestGradients(unittest.TestCase):
+    def test_adjoint_matches_parameter_shift(self):
+        rng = np.random.default_rng(8)
+        for _ in range(10):
+            n = int(rng.integers(2, 5))
+            circuit = random_circuit(rng, n, 30)
+            spec = {"".join(rng.choice(list("IXYZ"), size=n)): float(rng.normal()) for _ in range(4)}
+            adj = simulate_gradient(circuit, spec)
+            shift = simulate_gradient(circuit, spec, method="parameter_shift")
+            self.assertAlmostEqual(adj["expectation"], simulate_expectation(circuit, spec)["expectation"], places=10)
+            np.testing.assert_allclose([g["gradient"] for g in adj["gradients"]],
+                                       [g["gradient"] for g in shift["gradients"]], atol=1e-9)
+
+    def test_single_rotation(self):
+        theta = 0.7
+        circuit = {"qubits": 1, "gates": [{"type": "RX", "target": 0, "params": {"theta": theta}},
+                                          {"type": "MEASURE", "target": 0}]}
+        res = simulate_gradient(circuit, {"Z": 1})
+        self.assertEqual([g["type"] for g in res["gradients"]], ["RX"])
+        self.assertAlmostEqual(res["gradients"][0]["gradient"], -np.sin(theta), places=12)
+        ref = simulate_gradient(circuit, {"Z": 1}, method="parameter_shift", backend="cirq")
+        self.assertAlmostEqual(ref["gradients"][0]["gradient"], -np.sin(theta), places=5)
+        with self.assertRaises(ValueError):
+            simulate_gradient(circuit, {"Z": 1}, backend="cirq")
+
+    def test_api_gradient_mode(self):
+        app = create_app()
+        app.config["SIM_STORE_PATH"] = ""
+        client = app.test_client()
+        circuit = {"qubits": 1, "gates": [{"type": "RY", "target": 0, "params": {"theta": 0.2}}]}
+        res = client.post('/api/simulate', json={"circuit": circuit, "mode": "gradient", "observable": {"Z": 1}})
+        self.assertEqual(res.status_code, 200)
+        self.assertAlmostEqual(res.json["gradients"][0]["gradient"], -np.sin(0.2), places=12)
+        res = client.post('/api/simulate', json={"circuit": circuit, "mode": "gradient",
+                                                 "observable": {"Z": 1}, "method": "finite"})
+        self.assertEqual(res.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import tempfile
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import outofcore, statevector
+from app.circuit import parse_circuit
+from app.passes import fuse_gates
+from app.simulate import simulate
+from test_simulation import random_circuit
+
+
+class TestOutOfCore(unittest.TestCase):
+    def setUp(self):
+        self.scratch = tempfile.TemporaryDirectory()
+        outofcore.configure(self.scratch.name)
+
+    def tearDown(self):
+        outofcore.configure()
+        self.scratch.cleanup()
+
+    def test_streamed_passes_match_in_memory(self):
+        rng = np.random.default_rng(29)
+        for _ in range(5):
+            n, ops = parse_circuit(random_circuit(rng, 7, 60))
+            for circuit in (ops, fuse_gates(ops)[0]):
+                passes = outofcore.segments(circuit, n, 3)
+                self.assertTrue(all(len(high) <= outofcore.MAX_HIGH_QUBITS for high, _ in passes))
+                with outofcore.ScratchState(n) as state:
+                    outofcore.apply_ops(state.array, circuit, chunk_qubits=3)
+                    np.testing.assert_allclose(np.array(state.array).reshape(-1),
+                                               statevector.final_state(n, circuit), atol=1e-12)
+        self.assertEqual(outofcore.usage()["in_use"], 0)
+
+    def test_streamed_readout(self):
+        rng = np.random.default_rng(31)
+        n, ops = parse_circuit(random_circuit(rng, 6, 40))
+        expected = statevector.final_state(n, ops)
+        probs = np.abs(expected) ** 2
+        with outofcore.ScratchState(n) as state:
+            outofcore.apply_ops(state.array, ops, chunk_qubits=2)
+            idx, amps, total = outofcore.significant(state.array, top_k=5, chunk_qubits=2)
+            np.testing.assert_array_equal(idx, np.sort(np.argsort(probs)[-5:]))
+            np.testing.assert_allclose(amps, expected[idx], atol=1e-12)
+            self.assertAlmostEqual(total, 1.0)
+            idx, _, _ = outofcore.significant(state.array, threshold=0.05, chunk_qubits=2)
+            np.testing.assert_array_equal(idx, np.flatnonzero(probs > 0.05))
+            with self.assertRaises(ValueError):
+                outofcore.significant(state.array, threshold=0, chunk_qubits=2, max_entries=8)
+            with self.assertRaises(ValueError):
+                outofcore.significant(state.array, top_k=9, chunk_qubits=2, max_entries=8)
+            self.assertEqual(outofcore.significant(state.array, top_k=8, chunk_qubits=2, max_entries=8)[0].size, 8)
+            samples = outofcore.sample_indices(state.array, 20000, np.random.default_rng(1), chunk_qubits=2)
+            np.testing.assert_allclose(np.bincount(samples, minlength=probs.size) / 20000, probs, atol=0.02)
+
+    def test_memmap_backend(self):
+        rng = np.random.default_rng(37)
+        circuit = random_circuit(rng, 5, 30)
+        ref = simulate(circuit)
+        res = simulate(circuit, backend="memmap")
+        np.testing.assert_allclose(res["probabilities"], ref["probabilities"], atol=1e-12)
+        sparse = simulate(circuit, backend="memmap", sparse={"top_k": 3})["sparse"]
+        self.assertEqual(sparse, simulate(circuit, sparse={"top_k": 3})["sparse"])
+        bell = {"qubits": 2, "gates": [
+            {"type": "H", "target": 0}, {"type": "CNOT", "control": 0, "target": 1},
+            {"type": "MEASURE", "target": 0}, {"type": "MEASURE", "target": 1},
+        ]}
+        counts = simulate(bell, shots=200, backend="memmap")["counts"]
+        self.assertEqual(set(counts), {"00", "11"})
+
+    def test_quota(self):
+        outofcore.configure(self.scratch.name, quota=1024)
+        with outofcore.ScratchState(6):
+            with self.assertRaises(ValueError):
+                outofcore.ScratchState(6)
+        self.assertEqual(outofcore.usage()["in_use"], 0)
+        with self.assertRaises(ValueError):
+            simulate({"qubits": 7, "gates": []}, backend="memmap")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import statevector
+from app.circuit import Op, parse_circuit
+from app.passes import FUSION_MIN_QUBITS, fuse_gates, simplify_gates
+from app.simulate import simulate
+from test_simulation import random_circuit
+
+
+class TestGateFusion(unittest.TestCase):
+    def test_fused_circuit_is_equivalent(self):
+        rng = np.random.default_rng(21)
+        for _ in range(100):
+            n = int(rng.integers(2, 6))
+            n, ops = parse_circuit(random_circuit(rng, n, int(rng.integers(1, 40))))
+            fused, stats = fuse_gates(ops)
+            self.assertEqual(stats["sweeps"], len(fused))
+            np.testing.assert_allclose(statevector.final_state(n, fused), statevector.final_state(n, ops), atol=1e-12)
+            # Fusing again finds nothing left to merge
+            self.assertEqual(fuse_gates(fused)[1]["saved"], 0)
+
+    def test_sweeps_scale_with_entangling_gates(self):
+        gates = []
+        for _ in range(5):
+            for q in range(3):
+                gates += [{"type": t, "target": q} for t in ("H", "T", "H", "S")]
+            gates += [{"type": "CNOT", "control": 0, "target": 1}, {"type": "CZ", "control": 2, "target": 1}]
+        _, stats = fuse_gates(parse_circuit({"qubits": 3, "gates": gates})[1])
+        # Per layer: one dense sweep per wire, CNOT and CZ keep their cheap kernels
+        self.assertEqual(stats, {"gates": 70, "sweeps": 25, "saved": 45})
+
+    def test_narrow_states_skip_fusion(self):
+        gates = [{"type": t, "target": q} for q in range(FUSION_MIN_QUBITS) for t in ("H", "T")]
+        res = simulate({"qubits": FUSION_MIN_QUBITS - 1, "gates": gates[:-2]})
+        self.assertEqual(res["fusion"], {"gates": 22, "sweeps": 22, "saved": 0})
+        res = simulate({"qubits": FUSION_MIN_QUBITS, "gates": gates})
+        self.assertEqual(res["fusion"], {"gates": 24, "sweeps": 12, "saved": 12})
+
+    def test_structured_blocks_stay_structured(self):
+        ops = [Op("T", (0,), None), Op("CZ", (0, 1), None), Op("S", (1,), None),
+               Op("CNOT", (0, 1), None), Op("X", (1,), None), Op("H", (0,), None), Op("CNOT", (1, 0), None)]
+        fused, _ = fuse_gates(ops)
+        self.assertEqual([statevector.gate_kind(op) for op in fused], ["permutation", "permutation", "dense", "permutation"])
+        np.testing.assert_allclose(statevector.final_state(2, fused), statevector.final_state(2, ops), atol=1e-12)
+
+    def test_measurements_are_barriers(self):
+        circuit = {"qubits": 2, "gates": [
+            {"type": "H", "target": 0}, {"type": "MEASURE", "target": 0}, {"type": "H", "target": 0},
+            {"type": "T", "target": 0}, {"type": "CNOT", "control": 0, "target": 1}, {"type": "MEASURE", "target": 1},
+        ]}
+        fused, _ = fuse_gates(parse_circuit(circuit)[1])
+        self.assertEqual([op.name for op in fused], ["H", "MEASURE", "FUSED", "CNOT", "MEASURE"])
+        np.testing.assert_allclose(simulate(circuit)["probabilities"], [0.25] * 4, atol=1e-12)
+
+class TestPeephole(unittest.TestCase):
+    def test_simplified_circuit_has_identical_state(self):
+        rng = np.random.default_rng(4)
+        for _ in range(200):
+            n = int(rng.integers(2, 4))
+            n, ops = parse_circuit(random_circuit(rng, n, int(rng.integers(1, 40))))
+            simplified = simplify_gates(ops)
+            self.assertLessEqual(len(simplified), len(ops))
+            # Exact, including the global phase
+            np.testing.assert_allclose(statevector.final_state(n, simplified),
+                                       statevector.final_state(n, ops), atol=1e-12)
+
+    def test_rewrites(self):
+        def h(q):
+            return Op("H", (q,), None)
+
+        cases = [
+            ([h(0), h(0)], []),
+            ([Op("S", (0,), None)] * 4, []),
+            ([Op("T", (0,), None)] * 2, [Op("S", (0,), None)]),
+            ([Op("RZ", (0,), 0.25), Op("RZ", (0,), 0.5)], [Op("RZ", (0,), 0.75)]),
+            ([Op("RX", (0,), 4 * np.pi)], []),
+            ([Op("CZ", (0, 1), None), Op("CZ", (1, 0), None)], []),
+            # Commutes through gates on other wires, cascades after a cancellation
+            ([h(0), Op("X", (0,), None), h(1), Op("X", (0,), None), h(0)], [h(1)]),
+            # A gate on a shared wire blocks the rewrite
+            ([Op("CNOT", (0, 1), None), h(1), Op("CNOT", (0, 1), None)],
+             [Op("CNOT", (0, 1), None), h(1), Op("CNOT", (0, 1), None)]),
+            # RZ(2 pi) = -I is kept: dropping it would flip the global phase
+            ([Op("RZ", (0,), np.pi), Op("RZ", (0,), np.pi)], [Op("RZ", (0,), 2 * np.pi)]),
+        ]
+        for ops, expected in cases:
+            self.assertEqual(simplify_gates(ops), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,12 +11,13 @@ from app import create_app
 
 
 @pytest.fixture
-def app_instance():
+def app_instance(tmp_path):
     """Create a fresh Flask app instance for each test."""
     app = create_app()
     app.config.update(
         TESTING=True,
         SECRET_KEY="test-secret-key",
+        SIM_STORE_PATH=str(tmp_path / "sim_cache.db"),
     )
     return app
 
@@ -214,3 +215,271 @@ def test_api_quiz_submit_grades_and_saves_progress(client, monkeypatch, app_inst
     assert progress["status"] == "completed"
 
 
+
+def test_simulate_caches_deterministic_results(client):
+    """Equivalent circuits share one cache entry; sampled requests bypass the cache."""
+    bell = {"qubits": 2, "gates": [
+        {"type": "H", "target": 0, "step": 0},
+        {"type": "CNOT", "target": 1, "control": 0, "step": 1},
+    ]}
+    first = client.post("/api/simulate", json={"circuit": bell})
+    # Same circuit with different editor bookkeeping normalizes to the same key
+    moved = {"qubits": 2, "gates": [dict(g, step=g["step"] + 5) for g in bell["gates"]]}
+    second = client.post("/api/simulate", json={"circuit": moved})
+    assert first.get_json() == second.get_json()
+
+    measured = dict(bell, gates=bell["gates"] + [{"type": "MEASURE", "target": 0, "step": 2}])
+    client.post("/api/simulate", json={"circuit": measured, "shots": 10})
+
+    stats = client.get("/api/simulate/stats").get_json()["cache"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_redundant_gates_share_cache_entry(client):
+    """Circuits that only differ by cancelling pairs hit the same cache entry."""
+    plain = {"qubits": 2, "gates": [{"type": "H", "target": 0}, {"type": "RZ", "target": 1, "params": {"theta": 0.5}}]}
+    padded = {"qubits": 2, "gates": [
+        {"type": "X", "target": 1}, {"type": "H", "target": 0}, {"type": "X", "target": 1},
+        {"type": "RZ", "target": 1, "params": {"theta": 0.2}}, {"type": "S", "target": 0}, {"type": "S", "target": 0},
+        {"type": "Z", "target": 0}, {"type": "RZ", "target": 1, "params": {"theta": 0.3}},
+    ]}
+    first = client.post("/api/simulate", json={"circuit": plain}).get_json()
+    second = client.post("/api/simulate", json={"circuit": padded}).get_json()
+    assert first == second
+    assert client.get("/api/simulate/stats").get_json()["cache"]["hits"] == 1
+
+
+def test_result_cache_evicts_least_recently_used():
+    from app.cache import ResultCache
+
+    cache = ResultCache(max_entries=2, max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.put("c", b"1234")  # over max_entries: "b" is the LRU entry
+    assert cache.get("b") is None
+    cache.put("d", b"12345678")  # over max_bytes: drops "a", then "c"
+    stats = cache.stats()
+    assert stats["evictions"] == 3
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 8
+    cache.put("huge", b"x" * 11)
+    assert cache.get("huge") is None
+
+
+def test_prefix_cache_resumes_edited_circuits():
+    import numpy as np
+    from app.cache import PrefixStateCache
+    from app.simulate import simulate
+
+    # Nothing here is touched by the peephole pass, so prefix positions match the input
+    gates = [{"type": ["H", "T", "RY"][i % 3], "target": i % 4, "params": {"theta": float(i)}} for i in range(40)]
+    gates += [{"type": "CNOT", "control": i % 4, "target": (i + 1) % 4} for i in range(10)]
+    cache = PrefixStateCache(interval=16)
+    simulate({"qubits": 4, "gates": gates}, prefix_cache=cache)
+
+    # Appending resumes from the full previous circuit; editing gate 20 from the checkpoint at 16
+    edits = [gates + [{"type": "X", "target": 2}], gates[:20] + [{"type": "Z", "target": 1}] + gates[21:]]
+    for edited, skipped in zip(edits, (50, 16)):
+        before = cache.stats()["gates_skipped"]
+        circuit = {"qubits": 4, "gates": edited}
+        resumed = simulate(circuit, prefix_cache=cache)
+        assert cache.stats()["gates_skipped"] - before == skipped
+        # Fusion stats describe the whole circuit, whatever was resumed
+        assert resumed["fusion"] == simulate(circuit)["fusion"]
+        np.testing.assert_allclose(resumed["probabilities"], simulate(circuit)["probabilities"], atol=1e-12)
+    assert cache.stats()["hits"] == 2
+
+    # A repeat served entirely from the cache still reports the same fusion stats
+    wide = {"qubits": 12, "gates": [{"type": ["H", "T"][i // 12], "target": i % 12} for i in range(24)]}
+    first, repeat = (simulate(wide, prefix_cache=cache)["fusion"] for _ in range(2))
+    assert first == repeat == simulate(wide)["fusion"]
+    assert first["saved"] > 0
+
+
+def test_prefix_cache_is_bounded():
+    import numpy as np
+    from app.cache import PrefixStateCache
+
+    cache = PrefixStateCache(max_bytes=4 * 64)
+    keys = PrefixStateCache.prefix_keys(2, [])
+    for i in range(5):
+        cache.put(bytes([i]), np.zeros(4, dtype=complex))  # 64 bytes each
+    assert cache.stats()["bytes"] == 4 * 64
+    assert cache.longest([bytes([0])]) == (0, None)
+    cache.put(keys[0], np.zeros(8, dtype=complex))  # over a quarter of the budget
+    assert cache.longest(keys) == (0, None)
+
+
+def test_shared_store_serves_other_workers(tmp_path):
+    """A second app (another Passenger worker) reuses results persisted by the first."""
+    path = str(tmp_path / "shared.db")
+    workers = []
+    for _ in range(2):
+        app = create_app()
+        app.config.update(TESTING=True, SIM_STORE_PATH=path)
+        workers.append(app.test_client())
+
+    payload = {"circuit": {"qubits": 1, "gates": [{"type": "H", "target": 0}]}}
+    first = workers[0].post("/api/simulate", json=payload)
+    second = workers[1].post("/api/simulate", json=payload)
+    assert first.get_json() == second.get_json()
+
+    stats = workers[1].get("/api/simulate/stats").get_json()
+    assert stats["cache"]["misses"] == 1
+    assert stats["store"]["hits"] == 1
+    assert stats["store"]["entries"] == 1
+
+
+def test_shared_store_ttl_and_byte_limit(tmp_path, monkeypatch):
+    from app import store as store_module
+
+    clock = [1000.0]
+    monkeypatch.setattr(store_module.time, "time", lambda: clock[0])
+    store = store_module.SharedResultStore(str(tmp_path / "s.db"), ttl=60, max_bytes=10)
+
+    store.put("a", b"1234")
+    store.put("b", b"1234")
+    clock[0] += 1
+    assert store.get("a") == b"1234"  # "b" is now least recently used
+    store.put("c", b"1234")
+    assert store.get("b") is None
+    assert store.get("c") == b"1234"
+
+    clock[0] += 61
+    assert store.get("a") is None
+    assert store.stats()["entries"] == 2  # expired rows are purged on the next put
+    store.put("d", b"1")
+    assert store.stats()["entries"] == 1
+
+
+def test_simulate_batch_matches_single_requests(client):
+    """Batch results come back in request order and match /api/simulate."""
+    import numpy as np
+
+    circuits = [
+        {"qubits": 2, "gates": [{"type": "H", "target": 0}, {"type": "CNOT", "control": 0, "target": 1}]},
+        {"qubits": 1, "gates": [{"type": "RY", "target": 0, "params": {"theta": 0.7}}]},
+        {"qubits": 2, "gates": [{"type": "X", "target": 1}]},
+        {"qubits": 2, "gates": [{"type": "X", "target": 5}]},
+        {"qubits": 1, "gates": [{"type": "X", "target": 0}, {"type": "MEASURE", "target": 0}]},
+    ]
+    resp = client.post("/api/simulate/batch", json={"circuits": circuits})
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert len(results) == len(circuits)
+    assert "error" in results[3]
+    for i in (0, 1, 2, 4):
+        single = client.post("/api/simulate", json={"circuit": circuits[i]}).get_json()
+        assert results[i]["probabilities"] == pytest.approx(single["probabilities"])
+        assert set(results[i]) == set(single)
+
+    # Stacked circuits are fused and use the requested precision, like single ones
+    wide = {"qubits": 12, "gates": [{"type": ["H", "T"][i // 12], "target": i % 12} for i in range(24)]}
+    for precision in (None, "complex64"):
+        batch = client.post("/api/simulate/batch", json={"circuits": [wide], "precision": precision}).get_json()
+        single = client.post("/api/simulate", json={"circuit": wide, "precision": precision}).get_json()
+        assert batch["results"][0]["fusion"] == single["fusion"]
+        sv = [complex(x) for x in batch["results"][0]["statevector"]]
+        assert sv == pytest.approx([complex(x) for x in single["statevector"]], abs=1e-12 if precision is None else 1e-6)
+        assert all(complex(np.complex64(x)) == x for x in sv) == (precision == "complex64")
+
+
+def test_simulate_batch_rejects_non_list(client):
+    resp = client.post("/api/simulate/batch", json={"circuits": {"qubits": 1}})
+    assert resp.status_code == 400
+
+
+def test_simulate_base64_statevector(client):
+    """The binary encoding round-trips to the same amplitudes as the text format."""
+    import numpy as np
+    from app.encoding import decode_array
+
+    circuit = {"qubits": 2, "gates": [
+        {"type": "H", "target": 0},
+        {"type": "RX", "target": 1, "params": {"theta": 0.4}},
+        {"type": "CNOT", "control": 0, "target": 1},
+    ]}
+    text = client.post("/api/simulate", json={"circuit": circuit}).get_json()
+    expected = np.array([complex(x) for x in text["statevector"]])
+
+    packed = client.post("/api/simulate", json={"circuit": circuit, "format": "base64"}).get_json()
+    sv = decode_array(packed["statevector"])
+    assert packed["statevector"]["dtype"] == "float64"
+    np.testing.assert_allclose(sv[:, 0] + 1j * sv[:, 1], expected)
+    np.testing.assert_allclose(decode_array(packed["probabilities"]), text["probabilities"])
+
+    # Negotiated through the Accept header, here in single precision
+    resp = client.post(
+        "/api/simulate",
+        json={"circuit": circuit},
+        headers={"Accept": "application/vnd.qircuit.base64+json; dtype=float32"},
+    )
+    assert "Accept" in resp.headers["Vary"]
+    field = resp.get_json()["statevector"]
+    assert field["dtype"] == "float32"
+    sv = decode_array(field)
+    np.testing.assert_allclose(sv[:, 0] + 1j * sv[:, 1], expected, atol=1e-6)
+
+
+def test_accept_header_respects_quality():
+    from werkzeug.datastructures import MIMEAccept
+    from werkzeug.http import parse_accept_header
+    from app.encoding import negotiate
+
+    def pick(header):
+        return negotiate(accept=parse_accept_header(header, MIMEAccept))
+
+    assert pick("application/json, application/vnd.qircuit.base64+json;q=0.1") == ("json", "float64")
+    assert pick("application/json;q=0.5, application/vnd.qircuit.base64+json; dtype=float32") == ("base64", "float32")
+    assert pick("application/vnd.qircuit.base64+json, */*;q=0.1") == ("base64", "float64")
+    assert pick("*/*") == ("json", "float64")
+
+
+def test_simulate_rejects_unknown_format(client):
+    resp = client.post("/api/simulate", json={"circuit": {"qubits": 1}, "format": "xml"})
+    assert resp.status_code == 400
+
+
+def test_optimize_streams_iterations(client):
+    """QAOA MaxCut on a triangle streams one record per iteration, then a summary."""
+    payload = {"problem": {"type": "maxcut", "edges": [[0, 1], [1, 2], [0, 2]]},
+               "p": 1, "iterations": 30, "seed": 1}
+    resp = client.post("/api/optimize", json=payload)
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    records = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r["iteration"] for r in records[:-1]] == list(range(30))
+    summary = records[-1]
+    assert summary["done"] and summary["optimum"] == -2.0
+    assert summary["best_energy"] < records[0]["energy"]
+
+    # The returned circuit reproduces the best energy through the expectation API
+    observable = {"ZZI": 0.5, "IZZ": 0.5, "ZIZ": 0.5, "III": -1.5}
+    resp = client.post("/api/simulate", json={"circuit": summary["circuit"], "mode": "expectation",
+                                              "observable": observable})
+    assert abs(resp.get_json()["expectation"] - summary["best_energy"]) < 1e-9
+
+
+def test_optimize_vqe_without_streaming(client):
+    payload = {"problem": {"type": "hamiltonian", "qubits": 2, "observable": {"XX": 1, "ZZ": 1}},
+               "optimizer": "gd", "iterations": 200, "p": 1, "seed": 0, "stream": False}
+    resp = client.post("/api/optimize", json=payload)
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert len(body["history"]) == 200
+    # Ground energy of XX + ZZ is -2
+    assert body["best_energy"] < -1.99
+
+
+def test_optimize_rejects_bad_requests(client):
+    bad = [
+        {"problem": {"type": "maxcut", "edges": []}},
+        {"problem": {"type": "maxcut", "edges": [[0, 1]]}, "optimizer": "lbfgs"},
+        {"problem": {"type": "hamiltonian", "qubits": 2, "observable": {"XX": 1}}, "ansatz": "qaoa"},
+        {"problem": {"type": "maxcut", "edges": [[0, 1]]}, "p": 0},
+    ]
+    for payload in bad:
+        assert client.post("/api/optimize", json=payload).status_code == 400
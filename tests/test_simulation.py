@@ -10,9 +10,28 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from app import create_app
 from app.simulate import simulate
 
+RANDOM_GATES = ["X", "Y", "Z", "H", "S", "T", "RX", "RY", "RZ", "CNOT", "CZ", "SWAP"]
+
+
+def random_circuit(rng, n, depth):
+    gates = []
+    for step in range(depth):
+        t = RANDOM_GATES[rng.integers(len(RANDOM_GATES))]
+        a, b = (int(x) for x in rng.choice(n, size=2, replace=False))
+        g = {"type": t, "target": a, "step": step}
+        if t in ("RX", "RY", "RZ"):
+            g["params"] = {"theta": float(rng.uniform(-np.pi, np.pi))}
+        elif t in ("CNOT", "CZ"):
+            g["control"] = b
+        elif t == "SWAP":
+            g["params"] = {"other": b}
+        gates.append(g)
+    return {"qubits": n, "gates": gates}
+
 class TestSimulation(unittest.TestCase):
     def setUp(self):
         self.app = create_app()
+        self.app.config["SIM_STORE_PATH"] = ""
         self.client = self.app.test_client()
 
     def test_health(self):
@@ -121,5 +140,450 @@ class TestSimulation(unittest.TestCase):
         self.assertAlmostEqual(probs[0], 0.5, places=4)
         self.assertAlmostEqual(probs[1], 0.5, places=4)
 
+
+class TestNumpyBackend(unittest.TestCase):
+    def test_matches_cirq_statevector(self):
+        rng = np.random.default_rng(7)
+        for n in (2, 3, 5):
+            for _ in range(5):
+                circuit = random_circuit(rng, n, 25)
+                ref = simulate(circuit, backend="cirq")
+                res = simulate(circuit, backend="numpy")
+                np.testing.assert_allclose(res["probabilities"], ref["probabilities"], atol=1e-6)
+                sv = np.array([complex(x) for x in res["statevector"]])
+                sv_ref = np.array([complex(x) for x in ref["statevector"]])
+                np.testing.assert_allclose(sv, sv_ref, atol=1e-6)
+
+    def test_stacked_batch_matches_single_runs(self):
+        from app import statevector
+        from app.circuit import parse_circuit
+        rng = np.random.default_rng(11)
+        parsed = [parse_circuit(random_circuit(rng, 4, int(rng.integers(0, 30)))) for _ in range(12)]
+        states = statevector.final_states(4, [ops for _, ops in parsed])
+        for (n, ops), sv in zip(parsed, states):
+            np.testing.assert_allclose(sv, statevector.final_state(n, ops), atol=1e-12)
+
+    def test_structured_kernels_match_dense_products(self):
+        from app import statevector
+        from app.circuit import Op, parse_circuit
+        from app.passes import fuse_gates
+        rng = np.random.default_rng(13)
+        for n in (2, 4, 7):
+            for _ in range(10):
+                _, ops = parse_circuit(random_circuit(rng, n, 40))
+                psi = rng.normal(size=(2,) * n) + 1j * rng.normal(size=(2,) * n)
+                expected = psi
+                for op in ops:
+                    expected = statevector.apply_op(expected, op)
+                for circuit in (ops, fuse_gates(ops)[0]):
+                    out = statevector.apply_ops(psi.copy(), circuit)
+                    np.testing.assert_allclose(out, expected, atol=1e-10)
+        # A fused permutation with phases (CZ after CNOT) takes the slice kernel
+        block = fuse_gates([Op("CNOT", (2, 0), None), Op("CZ", (0, 2), None)])[0]
+        self.assertEqual([statevector.gate_kind(op) for op in block], ["permutation"])
+
+    def test_threaded_sweeps_match_single_thread(self):
+        from app import statevector
+        from app.circuit import parse_circuit
+        from app.passes import fuse_gates
+        rng = np.random.default_rng(17)
+        n, ops = parse_circuit(random_circuit(rng, 6, 80))
+        psi = rng.normal(size=(2,) * n) + 1j * rng.normal(size=(2,) * n)
+        for circuit in (ops, fuse_gates(ops)[0]):
+            statevector.set_threads(1)
+            expected = statevector.apply_ops(psi.copy(), circuit)
+            statevector.set_threads(4, min_qubits=3)
+            try:
+                out = statevector.apply_ops(psi.copy(), circuit)
+            finally:
+                statevector.set_threads(1)
+            np.testing.assert_allclose(out, expected, atol=1e-12)
+
+    def test_cache_blocked_application(self):
+        from app import statevector
+        from app.circuit import parse_circuit
+        from app.passes import fuse_gates
+        rng = np.random.default_rng(19)
+        n, ops = parse_circuit(random_circuit(rng, 7, 120))
+        schedule = statevector.block_schedule(ops, n, 4)
+        self.assertCountEqual([op for _, segment in schedule for op in segment], ops)
+        for kind, segment in schedule:
+            self.assertEqual(kind == "block", all(q >= 3 for op in segment for q in op.qubits))
+        psi = rng.normal(size=(2,) * n) + 1j * rng.normal(size=(2,) * n)
+        block_qubits = statevector.CACHE_BLOCK_QUBITS
+        for circuit in (ops, fuse_gates(ops)[0]):
+            expected = statevector.apply_ops(psi.copy(), circuit)
+            statevector.CACHE_BLOCK_QUBITS = 4
+            try:
+                out = statevector.apply_ops(psi.copy(), circuit)
+                statevector.set_threads(4, min_qubits=3)
+                threaded = statevector.apply_ops(psi.copy(), circuit)
+            finally:
+                statevector.CACHE_BLOCK_QUBITS = block_qubits
+                statevector.set_threads(1)
+            np.testing.assert_allclose(out, expected, atol=1e-12)
+            np.testing.assert_allclose(threaded, expected, atol=1e-12)
+
+    def test_single_precision(self):
+        from app import simulate as sim
+        from app import statevector
+        from app.cache import PrefixStateCache
+        from app.circuit import parse_circuit
+        rng = np.random.default_rng(23)
+        circuit = random_circuit(rng, 5, 40)
+        ref = simulate(circuit, precision="complex128")
+        for backend in ("numpy", "cirq"):
+            res = simulate(circuit, backend=backend, precision="complex64", sparse={"top_k": 32})
+            np.testing.assert_allclose(res["sparse"]["probabilities"], ref["probabilities"], atol=1e-6)
+        n, ops = parse_circuit(circuit)
+        self.assertEqual(statevector.final_state(n, ops, np.complex64).dtype, np.complex64)
+        self.assertEqual(sim.precision_dtype(None, sim.SINGLE_PRECISION_QUBITS), np.complex128)
+        self.assertEqual(sim.precision_dtype(None, sim.SINGLE_PRECISION_QUBITS + 1), np.complex64)
+        # Checkpoints of either precision never stand in for the other
+        cache = PrefixStateCache()
+        simulate(circuit, precision="complex64", prefix_cache=cache)
+        res = simulate(circuit, precision="complex128", prefix_cache=cache)
+        np.testing.assert_allclose([complex(x) for x in res["statevector"]],
+                                   [complex(x) for x in ref["statevector"]], atol=1e-12)
+        with self.assertRaises(ValueError):
+            simulate(circuit, precision="complex32")
+
+    def test_raw_shots_format(self):
+        circuit = {"qubits": 2, "gates": [
+            {"type": "X", "target": 1, "step": 0},
+            {"type": "MEASURE", "target": 0, "step": 1},
+            {"type": "MEASURE", "target": 1, "step": 1},
+        ]}
+        res = simulate(circuit, shots=5, backend="numpy")
+        self.assertEqual(res, {"shots": 5, "counts": {"01": 5}, "m0": [[0]] * 5, "m1": [[1]] * 5})
+        self.assertEqual(simulate(circuit, shots=5, backend="cirq"), res)
+
+    def test_large_shot_counts(self):
+        from app.simulate import MAX_RAW_SHOTS
+        circuit = {"qubits": 3, "gates": [
+            {"type": "H", "target": 0, "step": 0},
+            {"type": "T", "target": 0, "step": 1},
+            {"type": "RY", "target": 2, "step": 1, "params": {"theta": 2.0}},
+            {"type": "MEASURE", "target": 0, "step": 2},
+            {"type": "CNOT", "control": 0, "target": 1, "step": 3},
+            {"type": "MEASURE", "target": 2, "step": 4},
+        ]}
+        exact = simulate(circuit)["probabilities"]
+        for shots in (MAX_RAW_SHOTS, 200000):
+            res = simulate(circuit, shots=shots)
+            self.assertEqual(sum(res["counts"].values()), shots)
+            self.assertEqual("m0" in res, shots <= MAX_RAW_SHOTS)
+            freqs = np.zeros(8)
+            for bits, c in res["counts"].items():
+                freqs[int(bits, 2)] = c / shots
+            np.testing.assert_allclose(freqs, exact, atol=0.02)
+
+    def test_large_clifford_shot_counts(self):
+        from app.simulate import MAX_SHOTS
+        n = 30
+        gates = [{"type": "H", "target": 0}]
+        gates += [{"type": "CNOT", "control": q, "target": q + 1} for q in range(n - 1)]
+        gates += [{"type": "MEASURE", "target": q} for q in (0, 5, n - 1)]
+        res = simulate({"qubits": n, "gates": gates}, shots=MAX_SHOTS)
+        self.assertEqual(set(res["counts"]), {"0" * n, "1" + "0" * 4 + "1" + "0" * (n - 7) + "1"})
+        self.assertEqual(sum(res["counts"].values()), MAX_SHOTS)
+        self.assertAlmostEqual(res["counts"]["0" * n] / MAX_SHOTS, 0.5, delta=0.01)
+        with self.assertRaises(ValueError):
+            simulate({"qubits": n, "gates": gates}, shots=MAX_SHOTS + 1)
+
+    def test_per_shot_paths_count_in_chunks(self):
+        from unittest import mock
+        from app.simulate import MAX_RAW_SHOTS, MAX_TRAJECTORY_SHOTS
+        n, shots = 70, 2 * MAX_RAW_SHOTS
+        # A support too large for one multinomial: every shot is drawn
+        gates = [{"type": "H", "target": q} for q in range(n)] + [{"type": "MEASURE", "target": q} for q in range(n)]
+        with mock.patch("app.simulate.SHOT_CHUNK", 3000):
+            counts = simulate({"qubits": n, "gates": gates}, shots=shots)["counts"]
+            self.assertEqual(sum(counts.values()), shots)
+            self.assertTrue(all(len(k) == n for k in counts))
+            self.assertGreater(len(counts), shots * 0.99)
+
+            ghz = [{"type": "H", "target": 0}] + [{"type": "CNOT", "control": q, "target": q + 1} for q in range(29)]
+            ghz += [{"type": "MEASURE", "target": q} for q in (0, 29)]
+            counts = simulate({"qubits": 30, "gates": ghz}, shots=shots, backend="mps")["counts"]
+            self.assertEqual(set(counts), {"0" * 30, "1" + "0" * 28 + "1"})
+            self.assertEqual(sum(counts.values()), shots)
+
+        # Too many mid-circuit measurements to defer: one trajectory per shot
+        gates = [{"type": "RX", "target": 0, "params": {"theta": 1.0}}, {"type": "MEASURE", "target": 0}] * 24
+        with self.assertRaises(ValueError):
+            simulate({"qubits": 1, "gates": gates}, shots=MAX_TRAJECTORY_SHOTS + 1)
+
+    def test_clifford_readout_marginal(self):
+        from app import stabilizer
+        gates = [{"type": "H", "target": q} for q in range(0, 40, 2)]
+        gates += [{"type": "CNOT", "control": q, "target": q + 1} for q in range(0, 40, 2)]
+        gates += [{"type": "CNOT", "control": 1, "target": 3}]
+        gates += [{"type": "MEASURE", "target": q} for q in range(4)]
+        counts = simulate({"qubits": 40, "gates": gates}, shots=100000)["counts"]
+        self.assertEqual({k[:4] for k in counts}, {"0000", "0011", "1101", "1110"})
+        x0, basis = stabilizer.project(np.zeros(3, dtype=bool), np.array([[1, 1, 0], [0, 1, 0], [1, 0, 0]], dtype=bool), [0, 2])
+        self.assertEqual(basis.tolist(), [[True, False]])
+
+    def test_sampled_probabilities_are_marked(self):
+        circuit = {"qubits": 1, "gates": [{"type": "H", "target": 0}, {"type": "MEASURE", "target": 0}]}
+        self.assertNotIn("sampled_shots", simulate(circuit))
+        self.assertEqual(simulate(circuit, backend="cirq")["sampled_shots"], 1024)
+
+    def test_mid_circuit_measurement(self):
+        # q0 is measured before the CNOT, so the copy onto q1 must agree with it
+        circuit = {"qubits": 2, "gates": [
+            {"type": "H", "target": 0, "step": 0},
+            {"type": "MEASURE", "target": 0, "step": 1},
+            {"type": "CNOT", "target": 1, "control": 0, "step": 2},
+            {"type": "MEASURE", "target": 1, "step": 3},
+        ]}
+        probs = simulate(circuit, backend="numpy")["probabilities"]
+        np.testing.assert_allclose(probs, [0.5, 0, 0, 0.5], atol=1e-12)
+        # Same statistics from per-shot trajectories
+        raw = simulate(circuit, shots=200, backend="numpy")
+        self.assertEqual(raw["m0"], raw["m1"])
+
+    def test_terminal_measurements_are_exact(self):
+        # Only q1 is measured, so q0 reads 0 in every reported outcome
+        circuit = {"qubits": 2, "gates": [
+            {"type": "H", "target": 0, "step": 0},
+            {"type": "RY", "target": 1, "step": 0, "params": {"theta": 1.0}},
+            {"type": "MEASURE", "target": 1, "step": 1},
+        ]}
+        res = simulate(circuit, backend="numpy")
+        self.assertIsNone(res["statevector"])
+        p1 = np.sin(0.5) ** 2
+        np.testing.assert_allclose(res["probabilities"], [1 - p1, p1, 0, 0], atol=1e-12)
+        # The sampled reference agrees within shot noise
+        ref = simulate(circuit, backend="cirq")["probabilities"]
+        np.testing.assert_allclose(ref, res["probabilities"], atol=0.1)
+
+    def test_invalid_requests(self):
+        with self.assertRaises(ValueError):
+            simulate({"qubits": 1, "gates": []}, backend="qiskit")
+        with self.assertRaises(ValueError):
+            simulate({"qubits": 2, "gates": [{"type": "X", "target": 2}]})
+
+    def test_api_backend_selection(self):
+        app = create_app()
+        app.config["SIM_STORE_PATH"] = ""
+        client = app.test_client()
+        payload = {"circuit": {"qubits": 1, "gates": [{"type": "H", "target": 0}]}}
+        for backend in ("numpy", "cirq"):
+            res = client.post('/api/simulate', json=dict(payload, backend=backend))
+            self.assertEqual(res.status_code, 200)
+            self.assertAlmostEqual(res.json['probabilities'][0], 0.5, places=5)
+        res = client.post('/api/simulate', json=dict(payload, backend="nope"))
+        self.assertEqual(res.status_code, 400)
+
+
+class TestSweep(unittest.TestCase):
+    def test_linspace_sweep_matches_pointwise_runs(self):
+        from app.simulate import simulate_sweep
+        circuit = {"qubits": 2, "gates": [
+            {"type": "H", "target": 0},
+            {"type": "RY", "target": 1, "params": {"theta": {"start": 0, "stop": np.pi, "num": 9}}},
+            {"type": "CNOT", "control": 0, "target": 1},
+            {"type": "RZ", "target": 0, "params": {"theta": 0.3}},
+        ]}
+        res = simulate_sweep(circuit)
+        self.assertEqual(res["points"], 9)
+        self.assertEqual(len(res["parameters"]), 1)
+        ref = simulate_sweep(circuit, backend="cirq")
+        np.testing.assert_allclose(res["probabilities"], ref["probabilities"], atol=1e-6)
+        for i, theta in enumerate(np.linspace(0, np.pi, 9)):
+            single = dict(circuit, gates=[dict(g) for g in circuit["gates"]])
+            single["gates"][1]["params"] = {"theta": float(theta)}
+            np.testing.assert_allclose(res["probabilities"][i], simulate(single)["probabilities"], atol=1e-12)
+
+    def test_rx_curve_expectation(self):
+        from app.simulate import simulate_sweep
+        thetas = [0.0, np.pi / 2, np.pi]
+        circuit = {"qubits": 1, "gates": [{"type": "RX", "target": 0, "params": {"theta": thetas}}]}
+        z = [row[0] for row in simulate_sweep(circuit)["expectations"]]
+        np.testing.assert_allclose(z, np.cos(thetas), atol=1e-12)
+
+    def test_mismatched_sweeps_rejected(self):
+        from app.simulate import simulate_sweep
+        circuit = {"qubits": 1, "gates": [
+            {"type": "RX", "target": 0, "params": {"theta": [0, 1]}},
+            {"type": "RY", "target": 0, "params": {"theta": [0, 1, 2]}},
+        ]}
+        with self.assertRaises(ValueError):
+            simulate_sweep(circuit)
+
+    def test_api_sweep_mode(self):
+        app = create_app()
+        app.config["SIM_STORE_PATH"] = ""
+        client = app.test_client()
+        circuit = {"qubits": 1, "gates": [{"type": "RY", "target": 0, "params": {"theta": [0, np.pi]}}]}
+        res = client.post('/api/simulate', json={"circuit": circuit, "mode": "sweep"})
+        self.assertEqual(res.status_code, 200)
+        np.testing.assert_allclose(res.json["probabilities"], [[1, 0], [0, 1]], atol=1e-12)
+        # Without sweep mode a list angle is still an error
+        res = client.post('/api/simulate', json={"circuit": circuit})
+        self.assertEqual(res.status_code, 400)
+
+
+class TestSparseResults(unittest.TestCase):
+    def test_top_k_and_threshold(self):
+        from app.simulate import sparse_options
+        gates = [{"type": "RY", "target": 0, "params": {"theta": 0.4}},
+                 {"type": "H", "target": 1}, {"type": "RX", "target": 2, "params": {"theta": 2.0}}]
+        circuit = {"qubits": 3, "gates": gates}
+        dense = np.array(simulate(circuit)["probabilities"])
+        res = simulate(circuit, sparse=sparse_options(top_k=3))
+        self.assertIsNone(res["probabilities"])
+        top = sorted(np.argsort(dense)[-3:].tolist())
+        self.assertEqual(res["sparse"]["indices"], top)
+        np.testing.assert_allclose(res["sparse"]["probabilities"], dense[top], atol=1e-12)
+        self.assertAlmostEqual(res["sparse"]["omitted_probability"], 1 - dense[top].sum(), places=12)
+        self.assertEqual(len(res["sparse"]["amplitudes"]), 3)
+        res = simulate(circuit, sparse=sparse_options(threshold=0.1))
+        self.assertEqual(res["sparse"]["indices"], np.flatnonzero(dense > 0.1).tolist())
+
+    def test_nonzero_on_wide_register(self):
+        from app.simulate import sparse_options
+        gates = [{"type": "H", "target": 0}] + [{"type": "CNOT", "control": 0, "target": q} for q in range(1, 18)]
+        res = simulate({"qubits": 18, "gates": gates}, sparse=sparse_options(nonzero=True))
+        self.assertEqual(res["sparse"]["indices"], [0, 2 ** 18 - 1])
+        self.assertEqual(res["sparse"]["num_states"], 2 ** 18)
+
+    def test_api_sparse_fields(self):
+        app = create_app()
+        app.config["SIM_STORE_PATH"] = ""
+        client = app.test_client()
+        circuit = {"qubits": 2, "gates": [{"type": "H", "target": 0}, {"type": "MEASURE", "target": 0}]}
+        res = client.post('/api/simulate', json={"circuit": circuit, "nonzero": True})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json["sparse"]["indices"], [0, 2])
+        res = client.post('/api/simulate', json={"circuit": circuit, "top_k": 0})
+        self.assertEqual(res.status_code, 400)
+
+
+class TestReducedResults(unittest.TestCase):
+    def test_bloch_vectors_match_reduced_states(self):
+        import cirq
+        rng = np.random.default_rng(11)
+        for _ in range(10):
+            n = int(rng.integers(2, 6))
+            res = simulate(random_circuit(rng, n, 20), reduced="pairs")
+            sv = np.array([complex(a) for a in res["statevector"]])
+            probs = np.array(res["probabilities"]).reshape((2,) * n)
+            for q in range(n):
+                rho = cirq.density_matrix_from_state_vector(sv, [q])
+                expected = [2 * rho[0, 1].real, 2 * rho[1, 0].imag, (rho[0, 0] - rho[1, 1]).real]
+                np.testing.assert_allclose(res["bloch"][q], expected, atol=1e-9)
+                np.testing.assert_allclose(
+                    res["marginals"][q], probs.sum(axis=tuple(a for a in range(n) if a != q)), atol=1e-12)
+            self.assertEqual(len(res["pair_marginals"]), n * (n - 1) // 2)
+            for entry in res["pair_marginals"]:
+                i, j = entry["qubits"]
+                expected = probs.sum(axis=tuple(a for a in range(n) if a not in (i, j))).reshape(4)
+                np.testing.assert_allclose(entry["probabilities"], expected, atol=1e-12)
+
+    def test_measured_circuit_has_marginals_only(self):
+        circuit = {"qubits": 2, "gates": [{"type": "H", "target": 0}, {"type": "MEASURE", "target": 0}]}
+        res = simulate(circuit, reduced=True)
+        np.testing.assert_allclose(res["marginals"], [[0.5, 0.5], [1, 0]], atol=1e-12)
+        self.assertNotIn("bloch", res)
+        with self.assertRaises(ValueError):
+            simulate(circuit, reduced="triples")
+
+
+class TestTrace(unittest.TestCase):
+    def test_bell_timeline(self):
+        from app.simulate import simulate_trace
+        bell = {"qubits": 2, "gates": [
+            {"type": "H", "target": 0, "step": 0},
+            {"type": "X", "target": 1, "step": 0},
+            {"type": "CNOT", "control": 0, "target": 1, "step": 1},
+        ]}
+        res = simulate_trace(bell, amplitudes=True, bloch=True)
+        self.assertEqual([s["step"] for s in res["steps"]], [0, 1])
+        self.assertEqual(res["steps"][0]["gates"], ["H", "X"])
+        self.assertEqual(res["steps"][0]["indices"], [1, 3])
+        self.assertEqual(res["steps"][1]["indices"], [1, 2])
+        np.testing.assert_allclose(res["steps"][1]["probabilities"], [0.5, 0.5], atol=1e-12)
+        np.testing.assert_allclose(res["steps"][0]["bloch"], [[1, 0, 0], [0, 0, -1]], atol=1e-12)
+        np.testing.assert_allclose(res["steps"][1]["bloch"], [[0, 0, 0], [0, 0, 0]], atol=1e-12)
+        self.assertEqual(len(res["steps"][1]["amplitudes"]), 2)
+
+    def test_last_step_matches_simulate(self):
+        from app.simulate import simulate_trace
+        rng = np.random.default_rng(13)
+        for _ in range(10):
+            circuit = random_circuit(rng, int(rng.integers(2, 5)), 20)
+            # Pack gates into the earliest free column, like a hand-drawn circuit
+            depth = {}
+            for g in circuit["gates"]:
+                wires = [g["target"], g.get("control"), (g.get("params") or {}).get("other")]
+                wires = [q for q in wires if q is not None]
+                g["step"] = max(depth.get(q, 0) for q in wires)
+                depth.update({q: g["step"] + 1 for q in wires})
+            res = simulate_trace(circuit, threshold=0)
+            self.assertEqual(len(res["steps"]), max(depth.values()))
+            dense = np.zeros(2 ** circuit["qubits"])
+            dense[res["steps"][-1]["indices"]] = res["steps"][-1]["probabilities"]
+            np.testing.assert_allclose(dense, simulate(circuit)["probabilities"], atol=1e-12)
+
+    def test_payload_is_bounded(self):
+        from app.simulate import simulate_trace, MAX_TRACE_ENTRIES, TRACE_TOP_K
+        n = 14
+        gates = [{"type": "H", "target": q, "step": 0} for q in range(n)]
+        gates += [{"type": "Z", "target": 0, "step": s} for s in range(1, 200)]
+        circuit = {"qubits": n, "gates": gates}
+        res = simulate_trace(circuit)
+        self.assertEqual(len(res["steps"]), 200)
+        self.assertTrue(all(len(s["indices"]) == TRACE_TOP_K for s in res["steps"]))
+        with self.assertRaises(ValueError):
+            simulate_trace(circuit, threshold=0)
+        with self.assertRaises(ValueError):
+            simulate_trace(circuit, top_k=MAX_TRACE_ENTRIES // 100)
+
+        app = create_app()
+        app.config["SIM_STORE_PATH"] = ""
+        res = app.test_client().post('/api/simulate', json={"circuit": circuit, "mode": "trace", "threshold": 0})
+        self.assertEqual(res.status_code, 400)
+
+    def test_api_trace_mode_keys_on_steps(self):
+        app = create_app()
+        app.config["SIM_STORE_PATH"] = ""
+        client = app.test_client()
+        gates = [{"type": "H", "target": 0, "step": 0}, {"type": "H", "target": 1, "step": 1}]
+        res = client.post('/api/simulate', json={"circuit": {"qubits": 2, "gates": gates}, "mode": "trace"})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([s["indices"] for s in res.json["steps"]], [[0, 2], [0, 1, 2, 3]])
+        # Same gates in one column: one step, not a cached copy of the two-step trace
+        merged = [dict(g, step=0) for g in gates]
+        res = client.post('/api/simulate', json={"circuit": {"qubits": 2, "gates": merged}, "mode": "trace"})
+        self.assertEqual(len(res.json["steps"]), 1)
+
+
+class TestMoments(unittest.TestCase):
+    def test_steps_become_moments(self):
+        from app.simulate import circuit_from_json
+        gates = [
+            {"type": "CNOT", "control": 0, "target": 1, "step": 3},
+            {"type": "H", "target": 0, "step": 1},
+            {"type": "X", "target": 2, "step": 1},
+            {"type": "Z", "target": 2, "step": 7},
+        ]
+        c, _ = circuit_from_json({"qubits": 3, "gates": gates})
+        self.assertEqual([len(m) for m in c.moments], [2, 1, 1])
+        # Out-of-order payloads run in step order on both backends
+        np.testing.assert_allclose(simulate({"qubits": 3, "gates": gates})["probabilities"],
+                                   simulate({"qubits": 3, "gates": gates}, backend="cirq")["probabilities"],
+                                   atol=1e-6)
+        self.assertAlmostEqual(simulate({"qubits": 3, "gates": gates})["probabilities"][0b111], 0.5, places=12)
+
+    def test_step_conflicts_are_rejected(self):
+        gates = [{"type": "H", "target": 0, "step": 2}, {"type": "CNOT", "control": 0, "target": 1, "step": 2}]
+        for backend in ("numpy", "cirq"):
+            with self.assertRaises(ValueError):
+                simulate({"qubits": 2, "gates": gates}, backend=backend)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import stabilizer, statevector
+from app.circuit import Op
+from app.simulate import simulate
+
+
+def random_clifford(rng, n, depth):
+    ops = []
+    for _ in range(depth):
+        if n > 1 and rng.random() < 0.4:
+            a, b = (int(q) for q in rng.choice(n, size=2, replace=False))
+            ops.append(Op(["CNOT", "CZ", "SWAP"][rng.integers(3)], (a, b), None))
+        else:
+            ops.append(Op(["X", "Y", "Z", "H", "S"][rng.integers(5)], (int(rng.integers(n)),), None))
+    return ops
+
+
+def ghz(n, measure=False):
+    gates = [{"type": "H", "target": 0}]
+    gates += [{"type": "CNOT", "control": q, "target": q + 1} for q in range(n - 1)]
+    if measure:
+        gates += [{"type": "MEASURE", "target": q} for q in range(n)]
+    return {"qubits": n, "gates": gates}
+
+
+class TestStabilizer(unittest.TestCase):
+    def test_distribution_matches_dense_engine(self):
+        rng = np.random.default_rng(3)
+        for _ in range(50):
+            n = int(rng.integers(1, 6))
+            ops = random_clifford(rng, n, 30)
+            probs = np.abs(statevector.final_state(n, ops)) ** 2
+            x0, basis = stabilizer.run(n, ops).support()
+            dense = np.zeros(2 ** n)
+            for bits, p in stabilizer.outcome_probabilities(x0, basis).items():
+                dense[int(bits, 2)] = p
+            np.testing.assert_allclose(dense, probs, atol=1e-9)
+
+    def test_wide_ghz_statevector_request(self):
+        res = simulate(ghz(120))
+        self.assertIsNone(res["statevector"])
+        self.assertEqual(res["outcomes"], {"0" * 120: 0.5, "1" * 120: 0.5})
+        self.assertEqual(res["qubit_probabilities"], [0.5] * 120)
+
+    def test_wide_ghz_sampling_is_correlated(self):
+        res = simulate(ghz(100, measure=True))
+        self.assertEqual(set(res["outcomes"]) - {"0" * 100, "1" * 100}, set())
+
+    def test_mid_circuit_measurement_is_deferred(self):
+        # Teleport-style feed-forward: measure q0, then copy it onto q1
+        ops = [Op("H", (0,), None), Op("MEASURE", (0,), None),
+               Op("CNOT", (0, 1), None), Op("MEASURE", (1,), None)]
+        bits = stabilizer.sample_bits(2, ops, 500, np.random.default_rng(0))
+        np.testing.assert_array_equal(bits[:, 0], bits[:, 1])
+        self.assertTrue(0 < bits[:, 0].sum() < 500)
+
+
+if __name__ == '__main__':
+    unittest.main()